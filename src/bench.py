@@ -0,0 +1,160 @@
+# throughput benchmarks: python3 src/bench.py [--save] [--check]
+# times the parser, the inline tokenizer, serialization and a full build
+# over synthetic corpora and compares them with a stored baseline, plus how long
+# a fresh interpreter takes to import the build and to build a one-page site
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from blocks import markdown_to_blocks, markdown_to_html_node
+from corpus import SHAPES, generate_corpus
+from genpage import find_pages, generate_pages_recursive
+from main import BuildConfig, build
+from textnode import text_to_textnodes
+
+DEFAULT_BASELINE = "bench_baseline.json"
+
+
+def read_pages(content):
+    pages = []
+    for from_path, _ in find_pages(content, "out"):
+        with open(from_path) as f:
+            pages.append(f.read())
+    return pages
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_shape(shape, root, pages, repeat):
+    content = generate_corpus(root, shape, pages)
+    template = os.path.join(root, "template.html")
+    docs = read_pages(content)
+    paragraphs = [
+        block.replace("\n", " ")
+        for md in docs
+        for block in markdown_to_blocks(md)
+        if not block.startswith(("```", "#", "- ", ">")) and not block[0].isdigit()
+    ]
+    trees = [markdown_to_html_node(md) for md in docs]
+
+    def build():
+        out = os.path.join(root, "docs")
+        shutil.rmtree(out, ignore_errors=True)
+        with redirect_stdout(io.StringIO()):
+            generate_pages_recursive(content, template, out)
+
+    results = {
+        "markdown_to_html_node": best_of(lambda: [markdown_to_html_node(md) for md in docs], repeat),
+        "text_to_textnodes": best_of(lambda: [text_to_textnodes(p) for p in paragraphs], repeat),
+        "to_html": best_of(lambda: [tree.to_html() for tree in trees], repeat),
+        "generate_pages_recursive": best_of(build, repeat),
+    }
+    return {f"{shape}/{name}": seconds for name, seconds in results.items()}
+
+
+def bench_startup(root, repeat):
+    # cold: a new interpreter per run, as build.sh starts one. warm: build() again
+    # in this process, which keeps the compiled template and imports
+    content = generate_corpus(root, "small", 1)
+    os.makedirs(os.path.join(root, "static"), exist_ok=True)
+    src = os.path.dirname(os.path.abspath(__file__))
+
+    def run(cwd, *args):
+        subprocess.run([sys.executable, *args], cwd=cwd, stdout=subprocess.DEVNULL, check=True)
+
+    config = BuildConfig(
+        content=content,
+        static=os.path.join(root, "static"),
+        template=os.path.join(root, "template.html"),
+        public=os.path.join(root, "docs"),
+    )
+
+    def warm():
+        with redirect_stdout(io.StringIO()):
+            build(config)
+
+    warm()
+    return {
+        "startup/import_main": best_of(lambda: run(src, "-c", "import main"), repeat),
+        "startup/cold_build": best_of(lambda: run(root, os.path.join(src, "main.py")), repeat),
+        "startup/warm_build": best_of(warm, repeat),
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"{'benchmark':<40} {'now':>10} {'baseline':>10} {'change':>8}")
+    for name, seconds in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<40} {seconds * 1000:>8.1f}ms {'-':>10} {'new':>8}")
+            continue
+        change = seconds / base - 1
+        flag = ""
+        if change > tolerance:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<40} {seconds * 1000:>8.1f}ms {base * 1000:>8.1f}ms {change * 100:>+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark the parser and renderer")
+    parser.add_argument("--shape", action="append", choices=sorted(SHAPES), help="default: all shapes")
+    parser.add_argument("--pages", type=int, help="pages per shape (default: per shape)")
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs (default 3)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, metavar="PATH")
+    parser.add_argument("--save", action="store_true", help="store these results as the new baseline")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit 1 if any benchmark is slower than the baseline by more than --tolerance",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown (default 0.15)")
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON to PATH")
+    args = parser.parse_args()
+
+    results = {}
+    for shape in args.shape or sorted(SHAPES):
+        with tempfile.TemporaryDirectory() as root:
+            results.update(bench_shape(shape, root, args.pages, args.repeat))
+    with tempfile.TemporaryDirectory() as root:
+        results.update(bench_startup(root, args.repeat))
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+
+    record = {"python": platform.python_version(), "machine": platform.machine(), "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(record, f, indent=1)
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(record, f, indent=1)
+        print(f"saved baseline to {args.baseline}")
+    if args.check and regressions:
+        print(f"{len(regressions)} regression(s) over {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# micro-benchmark for block classification: python3 src/bench_classify.py [blocks]
+import random
+import re
+import sys
+import time
+
+from blocks import BlockType, classify_block, markdown_to_blocks
+from corpus import page_markdown
+
+
+def regex_block_type(block):
+    # the regex classifier block_to_block_type used to be
+    if re.match(r"^#{1,6} ", block):
+        return BlockType.HEADING
+    elif re.search(r"^```.*```$", block, re.DOTALL):
+        return BlockType.CODE
+    elif re.match(r"^>", block):
+        lines = block.split('\n')
+        if all(line.startswith(">") for line in lines):
+            return BlockType.QUOTE
+        return BlockType.PARAGRAPH
+    elif re.match(r"^- ", block):
+        lines = block.split('\n')
+        if all(line.startswith("- ") for line in lines):
+            return BlockType.UL
+        return BlockType.PARAGRAPH
+    elif re.match(r"^\d\. ", block):
+        lines = block.split('\n')
+        d = 1
+        for line in lines:
+            if not line.startswith(str(d) + '. '):
+                return BlockType.PARAGRAPH
+            d += 1
+        return BlockType.OL
+    else:
+        return BlockType.PARAGRAPH
+
+
+def regex_then_split(block):
+    # classifying and then splitting again to render, as markdown_to_html_node did
+    bt = regex_block_type(block)
+    if bt in (BlockType.QUOTE, BlockType.UL, BlockType.OL):
+        block.split("\n")
+    return bt
+
+
+def best_of(fn, blocks, runs=5):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        for block in blocks:
+            fn(block)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(0)
+    blocks = []
+    while len(blocks) < n:
+        blocks.extend(markdown_to_blocks(page_markdown(rng, "prose", 50)))
+    blocks = blocks[:n]
+    for block in blocks:
+        assert regex_block_type(block) == classify_block(block)[0], block
+    old = best_of(regex_then_split, blocks)
+    new = best_of(classify_block, blocks)
+    print(f"{'blocks':>8} {'regex':>12} {'fast path':>12} {'speedup':>8}")
+    print(f"{n:>8} {old * 1000:>10.1f}ms {new * 1000:>10.1f}ms {old / new:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# micro-benchmark for inline parsing: python3 src/bench_inline.py [max_links]
+import sys
+import time
+
+from textnode import (
+    TextNode,
+    TextType,
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+
+
+def split_chain(text):
+    # the five-pass pipeline text_to_textnodes used to run
+    tn = TextNode(text, TextType.TEXT)
+    tn = split_nodes_delimiter([tn], "`", TextType.CODE)
+    tn = split_nodes_delimiter(tn, "**", TextType.BOLD)
+    tn = split_nodes_delimiter(tn, "_", TextType.ITALIC)
+    tn = split_nodes_image(tn)
+    tn = split_nodes_link(tn)
+    return tn
+
+
+def link_paragraph(n):
+    return " ".join(f"see [link {i}](https://example.com/{i}) and" for i in range(n))
+
+
+def best_of(fn, text, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    max_links = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    print(f"{'links':>8} {'split chain':>12} {'scanner':>12} {'us/link':>8}")
+    n = max_links // 8
+    while n <= max_links:
+        text = link_paragraph(n)
+        assert split_chain(text) == text_to_textnodes(text)
+        old = best_of(split_chain, text, runs=1)
+        new = best_of(text_to_textnodes, text)
+        print(f"{n:>8} {old * 1000:>10.1f}ms {new * 1000:>10.1f}ms {new / n * 1e6:>8.2f}")
+        n *= 2
+
+
+if __name__ == "__main__":
+    main()
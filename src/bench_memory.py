@@ -0,0 +1,97 @@
+# memory held by full-site ASTs: python3 src/bench_memory.py [shape] [pages]
+# compares the slotted node classes against dict-backed copies of the old ones
+import sys
+import tempfile
+import tracemalloc
+
+import blocks
+import textnode
+from corpus import generate_corpus
+from genpage import find_pages
+
+
+class DictTextNode:
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+
+class DictHTMLNode:
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+
+class DictLeafNode(DictHTMLNode):
+    def __init__(self, tag, value, props=None):
+        super().__init__(tag, value, props=props)
+
+
+class DictParentNode(DictHTMLNode):
+    def __init__(self, tag, children, props=None):
+        super().__init__(tag, children=children, props=props)
+
+
+def measure(docs):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    trees = [blocks.markdown_to_html_node(md) for md in docs]
+    after = tracemalloc.take_snapshot()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocations = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    del trees
+    return held, peak, allocations
+
+
+def dict_backed(fn):
+    # swap the old dict-backed classes in under the names the parser looks up
+    # when it constructs nodes
+    names = [
+        (textnode, "TextNode", DictTextNode),
+        (textnode, "LeafNode", DictLeafNode),
+        (blocks, "LeafNode", DictLeafNode),
+        (blocks, "ParentNode", DictParentNode),
+    ]
+    saved = [(module, name, getattr(module, name)) for module, name, _ in names]
+    for module, name, cls in names:
+        setattr(module, name, cls)
+    try:
+        return fn()
+    finally:
+        for module, name, cls in saved:
+            setattr(module, name, cls)
+
+
+def compare(shape="small", pages=None):
+    # returns (pages, dict-backed, slotted), each measurement (held, peak, allocations)
+    with tempfile.TemporaryDirectory() as root:
+        docs = []
+        for from_path, _ in find_pages(generate_corpus(root, shape, pages), "out"):
+            with open(from_path) as f:
+                docs.append(f.read())
+
+    slotted = measure(docs)
+    old = dict_backed(lambda: measure(docs))
+    return len(docs), old, slotted
+
+
+def main():
+    shape = sys.argv[1] if len(sys.argv) > 1 else "small"
+    pages = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    count, old, slotted = compare(shape, pages)
+    print(f"{count} pages ({shape})")
+    print(f"{'':<14} {'held':>10} {'peak':>10} {'allocs':>10}")
+    for label, (held, peak, allocs) in (("dict-backed", old), ("slotted", slotted)):
+        print(f"{label:<14} {held / 2**20:>8.1f}MB {peak / 2**20:>8.1f}MB {allocs:>10}")
+    print(
+        f"{'saved':<14} {(1 - slotted[0] / old[0]) * 100:>9.1f}% {(1 - slotted[1] / old[1]) * 100:>9.1f}% "
+        f"{(1 - slotted[2] / old[2]) * 100:>9.1f}%"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from htmlnode import HTMLNode
+from template import RefRecorder
+
+BLOCKS_FILE = "blocks.json"
+CACHE_VERSION = 2
+# the modules that turn a block into html: an edit to any of them makes the
+# html stored on disk stale
+RENDERER_SOURCES = ("blocks.py", "textnode.py", "htmlnode.py", "template.py", "blockcache.py")
+
+
+class FragmentNode(HTMLNode):
+    # a block whose html is worked out once per url rewriter and then replayed.
+    # the parsed node is only built if some rewriter has no stored html yet.
+    # refs: the site urls in it, replayed into a page's RefRecorder along with the html
+    __slots__ = ("_node", "_build", "_digest", "_cache", "html", "refs")
+
+    def __init__(self, build, digest, cache, html=None, refs=None):
+        self._node = None
+        self._build = build
+        self._digest = digest
+        self._cache = cache
+        self.html = html if html is not None else {}
+        self.refs = refs
+
+    @property
+    def node(self):
+        if self._node is None:
+            self._node = self._build()
+        return self._node
+
+    def render(self, write, rewrite_url=None):
+        key = rewriter_key(rewrite_url)
+        html = self.html.get(key)
+        if html is None:
+            recorder = RefRecorder(rewrite_url)
+            html = self.html[key] = self.node.to_html(recorder)
+            self.refs = sorted(recorder.refs)
+            if isinstance(key, str):
+                self._cache.store(self._digest, key, html, self.refs)
+        elif isinstance(rewrite_url, RefRecorder):
+            rewrite_url.refs.update(self.refs)
+        write(html)
+
+    def __repr__(self):
+        return f"FragmentNode({self._digest}, {list(self.html)})"
+
+
+def renderer_version():
+    h = hashlib.sha1(str(CACHE_VERSION).encode())
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in RENDERER_SOURCES:
+        with open(os.path.join(here, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def rewriter_key(rewrite_url):
+    # a string key survives between builds; a rewriter without one is only
+    # cached in memory for this process
+    if rewrite_url is None:
+        return "/"
+    return getattr(rewrite_url, "cache_key", rewrite_url)
+
+
+class BlockCache:
+    def __init__(self, maxsize=4096, cache_dir=None, disk_maxsize=None):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()  # (block type, block) -> FragmentNode
+        self.hits = self.disk_hits = self.misses = 0
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, BLOCKS_FILE) if cache_dir else None
+        self.disk_maxsize = disk_maxsize or maxsize * 4
+        self.disk = OrderedDict()  # digest -> {"refs": [url, ...], "html": {rewriter key: html}}
+        self.new = {}
+        self.version = None
+        if self.path is not None:
+            self.version = renderer_version()
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+            except (FileNotFoundError, ValueError):
+                data = {}
+            if isinstance(data, dict) and data.get("version") == self.version:
+                self.disk = OrderedDict(data["blocks"])
+
+    def get(self, block, block_type, build):
+        key = (block_type, block)
+        fragment = self.entries.get(key)
+        if fragment is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return fragment
+
+        digest = stored = None
+        if self.path is not None:
+            digest = hashlib.sha1(f"{block_type.value}\n{block}".encode()).hexdigest()
+            stored = self.disk.get(digest)
+        if stored is not None:
+            self.disk.move_to_end(digest)
+            self.disk_hits += 1
+            fragment = FragmentNode(build, digest, self, dict(stored["html"]), stored["refs"])
+        else:
+            self.misses += 1
+            fragment = FragmentNode(build, digest, self)
+        self.entries[key] = fragment
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return fragment
+
+    def store(self, digest, key, html, refs):
+        if self.path is None:
+            return
+        for entries in (self.disk, self.new):
+            entry = entries.setdefault(digest, {"refs": refs, "html": {}})
+            entry["html"][key] = html
+        self.disk.move_to_end(digest)
+
+    def drain(self):
+        # counters and new disk entries since the last drain, for pool workers
+        stats = {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "new": self.new}
+        self.hits = self.disk_hits = self.misses = 0
+        self.new = {}
+        return stats
+
+    def merge(self, stats):
+        self.hits += stats["hits"]
+        self.disk_hits += stats["disk_hits"]
+        self.misses += stats["misses"]
+        for digest, entry in stats["new"].items():
+            for key, html in entry["html"].items():
+                self.store(digest, key, html, entry["refs"])
+
+    def save(self):
+        if self.path is None:
+            return
+        while len(self.disk) > self.disk_maxsize:
+            self.disk.popitem(last=False)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"version": self.version, "blocks": self.disk}, f)
+        os.replace(tmp, self.path)
+        self.new = {}
+
+    def summary(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        rate = (self.hits + self.disk_hits) / lookups * 100 if lookups else 0.0
+        return (
+            f"block cache: {self.hits} hits, {self.disk_hits} from disk, "
+            f"{self.misses} misses ({rate:.0f}% hit rate)"
+        )
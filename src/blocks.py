@@ -1,7 +1,6 @@
 from enum import Enum
-import re
-from htmlnode import HTMLNode, LeafNode, ParentNode
-from textnode import TextNode, TextType, text_node_to_html_node, text_to_textnodes
+from htmlnode import LeafNode, ParentNode
+from textnode import text_node_to_html_node, text_to_textnodes
 
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
@@ -15,94 +14,144 @@ def markdown_to_blocks(markdown):
     out = []
     blocks = markdown.split("\n\n")
     for block in blocks:
+        block = block.strip()
         if block != "":
-            out.append(block.strip())
+            out.append(block)
     return out
 
+def iter_blocks(lines):
+    # same blocks as markdown_to_blocks, but yielded as soon as the blank line
+    # that ends them is read, so only one block is ever held in memory
+    group = []
+    for line in lines:
+        line = line.rstrip("\n")
+        if line:
+            group.append(line)
+        elif group:
+            block = "\n".join(group).strip()
+            group = []
+            if block:
+                yield block
+    if group:
+        block = "\n".join(group).strip()
+        if block:
+            yield block
+
 def block_to_block_type(block):
-    if re.match(r"^#{1,6} ", block):
-        return BlockType.HEADING
-    elif re.search(r"^```.*```$", block, re.DOTALL):
-        return BlockType.CODE
-    elif re.match(r"^>", block):
-        lines = block.split('\n')
-        if all(line.startswith(">") for line in lines):
-            return BlockType.QUOTE
-        return BlockType.PARAGRAPH
-    elif re.match(r"^- ", block):
-        lines = block.split('\n')
-        if all(line.startswith("- ") for line in lines):
-            return BlockType.UL
-        return BlockType.PARAGRAPH
-    elif re.match(r"^\d\. ", block):
-        lines = block.split('\n')
-        d = 1
+    return classify_block(block)[0]
+
+def classify_block(block):
+    # The first character picks the only type the block could be, and the
+    # lines are split at most once and handed on so rendering doesn't redo it.
+    # returns (type, lines), lines is None when the type didn't need them
+    first = block[:1]
+    if first == "#":
+        level = len(block) - len(block.lstrip("#"))
+        if level <= 6 and block[level : level + 1] == " ":
+            return BlockType.HEADING, None
+    elif first == "`":
+        # same as re.search(r"^```.*```$", block, re.DOTALL)
+        if block.startswith("```") and (
+            (len(block) >= 6 and block.endswith("```"))
+            or (len(block) >= 7 and block.endswith("```\n"))
+        ):
+            return BlockType.CODE, None
+    elif first == ">":
+        lines = block.split("\n")
         for line in lines:
-            if not line.startswith(str(d) + '. '):
-                return BlockType.PARAGRAPH
-            d += 1
-        return BlockType.OL    
-    else:
-        return BlockType.PARAGRAPH
-
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
+            if not line.startswith(">"):
+                return BlockType.PARAGRAPH, lines
+        return BlockType.QUOTE, lines
+    elif first == "-":
+        if block.startswith("- "):
+            lines = block.split("\n")
+            for line in lines:
+                if not line.startswith("- "):
+                    return BlockType.PARAGRAPH, lines
+            return BlockType.UL, lines
+    elif first.isdecimal():
+        if block[1:3] == ". ":
+            lines = block.split("\n")
+            for d, line in enumerate(lines, 1):
+                if not line.startswith(f"{d}. "):
+                    return BlockType.PARAGRAPH, lines
+            return BlockType.OL, lines
+    return BlockType.PARAGRAPH, None
+
+def markdown_to_html_node(markdown, cache=None):
     nodes = []
-    for block in blocks:
-        bt = block_to_block_type(block)
-        match bt:
-            case BlockType.PARAGRAPH:
-                o = block.replace("\n", " ")
-                node = ParentNode("p", text_to_children(o))
-
-            case BlockType.HEADING:
-                level = 0
-                for char in block:
-                    if char == '#':
-                        level += 1
-                    else:
-                        break
-                content = block[level:].strip()
-                tag = f"h{level}"
-                node = ParentNode(tag, text_to_children(content))
-
-            case BlockType.CODE:  #TODO this strips the \n from the end that is importatnly INSDIE the code block and shouldnt be touched
-                if not block.startswith("```") or not block.endswith("```"):
-                    raise ValueError("invalid code block")
-                tn = TextNode(block[4:-3], TextType.TEXT)
-                cn = ParentNode("code", [text_node_to_html_node(tn)])
-                node = ParentNode("pre", [cn])
-
-            case BlockType.QUOTE:
-                lines = block.split("\n")
-                clean = [line.lstrip('> ') for line in lines]
-                o = " ".join(clean)
-                node = ParentNode("blockquote", text_to_children(o))
-
-            case BlockType.UL:
-                lines = block.split("\n")
-                list_items = []
-                
-                for line in lines:
-                    if line.strip().startswith("- "):
-                        list_item = ParentNode("li", text_to_children(line[2:]))
-                        list_items.append(list_item)
-                node = ParentNode("ul", list_items)
-
-            case BlockType.OL:
-                lines = block.split("\n")
-                clean = []
-                for line in lines:
-                    if line.strip():
-                        for i, char in enumerate(line):
-                            if not (char.isdigit() or char == "." or char.isspace()):
-                                clean.append(ParentNode("li", text_to_children(line[i:])))
-                                break
-                node = ParentNode("ol", clean)
-
-        nodes.append(node)
+    for block in markdown_to_blocks(markdown):
+        bt, lines = classify_block(block)
+        if cache is None:
+            nodes.append(block_to_html_node(block, bt, lines))
+        else:
+            nodes.append(cache.get(
+                block, bt, lambda block=block, bt=bt, lines=lines: block_to_html_node(block, bt, lines)
+            ))
     return ParentNode("div", nodes)
 
+def write_markdown_html(lines, write, rewrite_url=None):
+    # streaming markdown_to_html_node(...).render(write) for documents too big to
+    # keep whole: each block is parsed, written and dropped before the next is read
+    write("<div>")
+    for block in iter_blocks(lines):
+        bt, lines = classify_block(block)
+        block_to_html_node(block, bt, lines).render(write, rewrite_url)
+    write("</div>")
+
+def block_to_html_node(block, bt=None, lines=None):
+    if bt is None:
+        bt, lines = classify_block(block)
+    if lines is None and bt in (BlockType.QUOTE, BlockType.UL, BlockType.OL):
+        lines = block.split("\n")
+    match bt:
+        case BlockType.PARAGRAPH:
+            o = " ".join(lines) if lines is not None else block.replace("\n", " ")
+            node = ParentNode("p", text_to_children(o))
+
+        case BlockType.HEADING:
+            level = 0
+            for char in block:
+                if char == '#':
+                    level += 1
+                else:
+                    break
+            content = block[level:].strip()
+            tag = f"h{level}"
+            node = ParentNode(tag, text_to_children(content))
+
+        case BlockType.CODE:  #TODO this strips the \n from the end that is importatnly INSDIE the code block and shouldnt be touched
+            if not block.startswith("```") or not block.endswith("```"):
+                raise ValueError("invalid code block")
+            # a code leaf, so urls in a code sample are written as they are
+            node = ParentNode("pre", [LeafNode("code", block[4:-3])])
+
+        case BlockType.QUOTE:
+            clean = [line.lstrip('> ') for line in lines]
+            o = " ".join(clean)
+            node = ParentNode("blockquote", text_to_children(o))
+
+        case BlockType.UL:
+            list_items = []
+
+            for line in lines:
+                if line.strip().startswith("- "):
+                    list_item = ParentNode("li", text_to_children(line[2:]))
+                    list_items.append(list_item)
+            node = ParentNode("ul", list_items)
+
+        case BlockType.OL:
+            clean = []
+            for line in lines:
+                if line.strip():
+                    for i, char in enumerate(line):
+                        if not (char.isdigit() or char == "." or char.isspace()):
+                            clean.append(ParentNode("li", text_to_children(line[i:])))
+                            break
+            node = ParentNode("ol", clean)
+
+    return node
+
 def text_to_children(text):
     nodes = []
     for node in text_to_textnodes(text):
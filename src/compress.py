@@ -0,0 +1,113 @@
+# precompressed sidecars behind --compress: index.html gets index.html.gz (and
+# index.html.br with the brotli module) so the server can send them as they are.
+# the manifest remembers what was compressed, so only new or changed outputs
+# are compressed again
+import gzip
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import Manifest
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESS_EXTS = (".html", ".css", ".js", ".mjs", ".json", ".svg", ".xml", ".txt", ".map")
+DEFAULT_MIN_SIZE = 1024
+
+
+def compress_file(path, encodings, gzip_level=9, brotli_quality=11):
+    # runs on the thread pool, zlib and brotli release the GIL while they work
+    with open(path, "rb") as f:
+        data = f.read()
+    st = os.stat(path)
+    for encoding in encodings:
+        if encoding == "gzip":
+            # mtime=0 keeps the .gz byte-identical between builds
+            out, packed = path + ".gz", gzip.compress(data, gzip_level, mtime=0)
+        else:
+            out, packed = path + ".br", brotli.compress(data, quality=brotli_quality)
+        tmp = out + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(packed)
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, out)
+
+
+def compress_output(dst, gzip_level=9, brotli_quality=11, min_size=DEFAULT_MIN_SIZE, jobs=1):
+    manifest = Manifest.load(dst)
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+    previous = dict(manifest.compressed)
+    counts = Counter()
+    pending = []
+    seen = set()
+    for dirpath, dirnames, filenames in os.walk(dst):
+        dirnames.sort()
+        for f in sorted(filenames):
+            path = os.path.join(dirpath, f)
+            if f.startswith(".") or not f.endswith(COMPRESS_EXTS):
+                continue
+            rel = os.path.relpath(path, dst)
+            st = os.stat(path)
+            if st.st_size < min_size:
+                continue
+            seen.add(rel)
+            entry = manifest.compressed.get(rel)
+            if (
+                entry
+                and entry["size"] == st.st_size
+                and entry["mtime"] == st.st_mtime_ns
+                and entry["encodings"] == encodings
+                and entry["levels"] == [gzip_level, brotli_quality]
+                and all(os.path.exists(path + sidecar(e)) for e in encodings)
+            ):
+                counts["unchanged"] += 1
+                continue
+            pending.append((path, rel, st))
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = [
+            (rel, st, pool.submit(compress_file, path, encodings, gzip_level, brotli_quality))
+            for path, rel, st in pending
+        ]
+        for rel, st, future in futures:
+            future.result()
+            manifest.compressed[rel] = {
+                "size": st.st_size,
+                "mtime": st.st_mtime_ns,
+                "encodings": encodings,
+                "levels": [gzip_level, brotli_quality],
+            }
+            counts["compressed"] += 1
+
+    for rel in [rel for rel in manifest.compressed if rel not in seen]:
+        del manifest.compressed[rel]
+    counts["removed"] = remove_stale_sidecars(dst, previous, seen, encodings)
+    manifest.save()
+    print(
+        f"compress: {counts['compressed']} compressed ({', '.join(encodings)}), "
+        f"{counts['unchanged']} unchanged, {counts['removed']} stale sidecars removed"
+    )
+    return counts
+
+
+def sidecar(encoding):
+    return ".gz" if encoding == "gzip" else ".br"
+
+
+def remove_stale_sidecars(dst, previous, compressed, encodings):
+    # only sidecars we wrote last time: of outputs that are gone or shrank under
+    # min_size, and of encodings we can no longer write. a .gz that came from
+    # static/ is never ours to remove
+    removed = 0
+    for rel, entry in previous.items():
+        for encoding in entry["encodings"]:
+            if rel in compressed and encoding in encodings:
+                continue
+            path = os.path.join(dst, rel) + sidecar(encoding)
+            if os.path.exists(path):
+                os.remove(path)
+                removed += 1
+    return removed
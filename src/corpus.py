@@ -0,0 +1,121 @@
+# synthetic content trees for benchmarks: python3 src/corpus.py SHAPE DIR [--pages N]
+import argparse
+import os
+import random
+
+WORDS = (
+    "the of and to in is that it was for on are as with his they at be this from have or by one "
+    "had not but what all were when we there can an your which their said if do will each about "
+    "how up out them then she many some so these would other into has more her two like him see"
+).split()
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+# shape -> (default page count, blocks per page, kind of page, directory depth)
+SHAPES = {
+    "small": (2000, 6, "prose", 2),
+    "huge": (4, 8000, "prose", 1),
+    "links": (300, 40, "links", 2),
+    "code": (300, 40, "code", 2),
+    "nested": (500, 10, "prose", 12),
+}
+
+
+def words(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def inline(rng, n):
+    out = []
+    for _ in range(n):
+        r = rng.random()
+        if r < 0.08:
+            out.append(f"**{words(rng, 2)}**")
+        elif r < 0.14:
+            out.append(f"_{words(rng, 2)}_")
+        elif r < 0.18:
+            out.append(f"`{rng.choice(WORDS)}()`")
+        elif r < 0.22:
+            out.append(f"[{words(rng, 2)}](/{rng.choice(WORDS)}/{rng.randrange(1000)})")
+        else:
+            out.append(rng.choice(WORDS))
+    return " ".join(out)
+
+
+def link_line(rng, n):
+    return " ".join(
+        f"[{words(rng, 2)}](https://example.com/{rng.randrange(10**6)}) and" for _ in range(n)
+    )
+
+
+def code_block(rng, lines):
+    body = "\n".join(f"    {words(rng, 4)} = {rng.randrange(100)} ** {words(rng, 1)}_x" for _ in range(lines))
+    return f"```\n{body}\n```"
+
+
+def block(rng, kind):
+    r = rng.random()
+    if kind == "links" and r < 0.7:
+        return link_line(rng, rng.randint(5, 40))
+    if kind == "code" and r < 0.5:
+        return code_block(rng, rng.randint(5, 30))
+    if r < 0.1:
+        return "#" * rng.randint(2, 4) + " " + words(rng, 4)
+    if r < 0.2:
+        return "\n".join(f"- {inline(rng, 8)}" for _ in range(rng.randint(2, 8)))
+    if r < 0.28:
+        return "\n".join(f"{i}. {inline(rng, 8)}" for i in range(1, rng.randint(3, 9)))
+    if r < 0.33:
+        return "\n".join(f"> {inline(rng, 10)}" for _ in range(rng.randint(1, 4)))
+    if r < 0.38:
+        return code_block(rng, rng.randint(2, 8))
+    return "\n".join(inline(rng, 12) for _ in range(rng.randint(1, 5)))
+
+
+def page_markdown(rng, kind, blocks):
+    out = [f"# {words(rng, 5)}"]
+    for _ in range(blocks):
+        out.append(block(rng, kind))
+    return "\n\n".join(out) + "\n"
+
+
+def generate_corpus(root, shape, pages=None, seed=0, blocks=None):
+    # writes root/content/**.md and root/template.html, returns the content dir
+    default_pages, default_blocks, kind, depth = SHAPES[shape]
+    pages = default_pages if pages is None else pages
+    blocks = default_blocks if blocks is None else blocks
+    rng = random.Random(seed)
+    content = os.path.join(root, "content")
+    for i in range(pages):
+        parts = [f"d{rng.randrange(4)}" for _ in range(rng.randint(0, depth - 1))]
+        directory = os.path.join(content, *parts)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"page{i}.md"), "w") as f:
+            f.write(page_markdown(rng, kind, blocks))
+    with open(os.path.join(root, "template.html"), "w") as f:
+        f.write(TEMPLATE)
+    return content
+
+
+def main():
+    parser = argparse.ArgumentParser(description="write a synthetic content tree")
+    parser.add_argument("shape", choices=sorted(SHAPES))
+    parser.add_argument("root")
+    parser.add_argument("--pages", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate_corpus(args.root, args.shape, args.pages, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# what each page depends on: the template, the static files and the other pages
+# its html points at. the urls are recorded as every page is rendered (see
+# template.RefRecorder) and kept in the manifest, so the graph is rebuilt from docs/ without parsing:
+#   python3 src/depgraph.py why-rebuild content/blog/tom/index.md
+#   python3 src/depgraph.py dependents static/images/tom.png
+#   python3 src/depgraph.py unused
+import os
+
+from images import load_images, url_versions
+from manifest import Manifest, hash_template, load_asset_manifest
+
+class DependencyGraph:
+    def __init__(self, manifest, dir_path_static, template_path, dir_path_public):
+        self.manifest = manifest
+        self.static = os.path.normpath(dir_path_static)
+        self.template_path = os.path.normpath(template_path)
+        self.public = os.path.normpath(dir_path_public)
+        # output url -> source page, for the ways a page can be linked to
+        self.urls = {}
+        for src, entry in manifest.pages.items():
+            rel = os.path.relpath(entry["output"], self.public).replace(os.sep, "/")
+            urls = ["/" + rel, "/" + rel[:-len(".html")]]
+            if rel == "index.html" or rel.endswith("/index.html"):
+                urls += ["/" + rel[:-len("index.html")], "/" + rel[:-len("/index.html")]]
+            for url in urls:
+                self.urls[url] = os.path.normpath(src)
+        self.deps = {
+            os.path.normpath(src): self.resolve(entry.get("refs", []), entry.get("templates"))
+            for src, entry in manifest.pages.items()
+        }
+
+    def resolve(self, refs, templates=None):
+        # templates: the page's template and its partials, as the manifest has them
+        deps = {os.path.normpath(t) for t in templates} if templates else {self.template_path}
+        for url in refs:
+            if url in self.urls:
+                deps.add(self.urls[url])
+                continue
+            path = os.path.join(self.static, *url.split("/"))
+            if os.path.isfile(path):
+                deps.add(path)
+        return deps
+
+    def dependencies(self, src):
+        return sorted(self.deps.get(os.path.normpath(src), ()))
+
+    def dependents(self, path):
+        path = os.path.normpath(path)
+        return sorted(src for src, deps in self.deps.items() if path in deps)
+
+    def unused_static(self):
+        # static files no page points at; the template's own links count, since
+        # every page carries them
+        used = set().union(*self.deps.values()) if self.deps else set()
+        unused = []
+        for dirpath, _, filenames in os.walk(self.static):
+            for f in filenames:
+                path = os.path.join(dirpath, f)
+                if path not in used:
+                    unused.append(path)
+        return sorted(unused)
+
+    def why_rebuild(self, src, basepath=None, minify=None, images=None):
+        # the reasons the next incremental build will render src, empty if it won't.
+        # a setting left as None is the one the page was last built with
+        key = next((k for k in self.manifest.pages if os.path.normpath(k) == os.path.normpath(src)), src)
+        entry = self.manifest.pages.get(key)
+        if entry is None:
+            return ["never built"]
+        if basepath is None:
+            basepath = entry["basepath"]
+        if minify is None:
+            minify = entry["template"].endswith("+min")
+        known = load_images(self.public)
+        if images is None:
+            images = built_with_images(entry, known)
+        assets = url_versions(load_asset_manifest(self.public), known if images else {})
+        source_hash, _ = self.manifest.source_hash(key)
+        files = entry.get("templates") or [self.template_path]
+        template_hash = hash_template(files[0], minify, files[1:])
+        return self.manifest.dirty_reasons(key, entry["output"], source_hash, template_hash, basepath, assets)
+
+
+def built_with_images(entry, images):
+    # whether the page got --images attributes for the images it shows; one
+    # without any images doesn't care either way
+    used = entry.get("assets", {})
+    for url in entry.get("refs", []):
+        if url in images:
+            return used.get(url, "").endswith(url_versions({}, {url: images[url]})[url])
+    return False
+
+
+def main():
+    # only the command line needs argparse
+    import argparse
+
+    parser = argparse.ArgumentParser(description="query what the pages of the last build depend on")
+    parser.add_argument("command", choices=["why-rebuild", "dependents", "dependencies", "unused"])
+    parser.add_argument("path", nargs="?")
+    # each defaults to what the page was last built with
+    parser.add_argument("--basepath", help="ask about a build under this basepath")
+    parser.add_argument("--minify", action=argparse.BooleanOptionalAction, help="ask about a --minify build or not")
+    parser.add_argument("--images", action=argparse.BooleanOptionalAction, help="ask about an --images build or not")
+    parser.add_argument("--static", default="./static")
+    parser.add_argument("--template", default="./template.html")
+    parser.add_argument("--public", default="./docs")
+    args = parser.parse_args()
+    if args.command != "unused" and args.path is None:
+        parser.error(f"{args.command} needs a path")
+
+    graph = DependencyGraph(Manifest.load(args.public), args.static, args.template, args.public)
+    if args.command == "why-rebuild":
+        reasons = graph.why_rebuild(args.path, args.basepath, args.minify, args.images)
+        print("\n".join(reasons) if reasons else "up to date")
+    elif args.command == "dependents":
+        print("\n".join(graph.dependents(args.path)))
+    elif args.command == "dependencies":
+        print("\n".join(graph.dependencies(args.path)))
+    else:
+        print("\n".join(graph.unused_static()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+
+
+class SiteTestCase(unittest.TestCase):
+    # a throwaway site laid out like the real one: content/, static/, docs/ and
+    # template.html in a temp dir. subclasses write their pages after setUp
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.public = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(self.content)
+        os.makedirs(self.static)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
@@ -0,0 +1,81 @@
+# front matter: a block of fields at the very top of a page, between fences.
+#   ---                   +++
+#   title: Tom            title = "Tom"
+#   date: 2024-05-01      date = 2024-05-01
+#   draft: true           draft = true
+#   weight: 10            weight = 10
+#   template: blog.html   template = "blog.html"
+#   ---                   +++
+# "---" takes yaml-style "key: value" lines, "+++" toml-style "key = value".
+# values are strings, integers, floats, true/false or [lists, of, them].
+# read_front_matter reads a file only up to the closing fence, so pages can
+# be listed, sorted and filtered without reading their bodies
+import re
+
+FENCES = {"---": ":", "+++": "="}
+
+_NUMBER = re.compile(r"[+-]?\d+(\.\d+)?$")
+
+
+def parse_value(text):
+    text = text.strip()
+    if len(text) >= 2 and text[0] == text[-1] and text[0] in "\"'":
+        return text[1:-1]
+    if text.startswith("[") and text.endswith("]"):
+        return [parse_value(item) for item in text[1:-1].split(",") if item.strip()]
+    if text in ("true", "false"):
+        return text == "true"
+    m = _NUMBER.match(text)
+    if m:
+        return float(text) if m.group(1) else int(text)
+    return text
+
+
+def parse_lines(lines, sep, where="front matter"):
+    # lines: the ones between the fences, without newlines
+    fields = {}
+    for n, line in enumerate(lines, 2):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        key, found, value = stripped.partition(sep)
+        if not found or not key.strip():
+            raise ValueError(f"{where}:{n}: expected key {sep} value, got {line!r}")
+        fields[key.strip()] = parse_value(value)
+    return fields
+
+
+def read_front_matter(path):
+    # returns (fields, how many lines they take up with the fences); a file
+    # without front matter costs the read of its first line
+    with open(path) as f:
+        first = f.readline().rstrip("\n")
+        sep = FENCES.get(first)
+        if sep is None:
+            return {}, 0
+        lines = []
+        for line in f:
+            line = line.rstrip("\n")
+            if line == first:
+                return parse_lines(lines, sep, path), len(lines) + 2
+            lines.append(line)
+    raise ValueError(f"{path}: front matter is never closed with {first.rstrip()}")
+
+
+def split_front_matter(text, where="front matter"):
+    # the same for a page that is read whole anyway: (fields, body)
+    fence = text[:3]
+    sep = FENCES.get(fence)
+    if sep is None or text[3:4] not in ("\n", ""):
+        return {}, text
+    end = text.find(f"\n{fence}", 3)
+    while end >= 0 and text[end + 4 : end + 5] not in ("\n", ""):
+        end = text.find(f"\n{fence}", end + 1)
+    if end < 0:
+        raise ValueError(f"{where}: front matter is never closed with {fence}")
+    fields = parse_lines(text[4:end].split("\n") if end > 3 else [], sep, where)
+    return fields, text[end + 5 :]
+
+
+def is_draft(path):
+    return read_front_matter(path)[0].get("draft") is True
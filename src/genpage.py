@@ -1,49 +1,430 @@
 import os
+from itertools import islice
 
-from blocks import markdown_to_html_node
+from blocks import markdown_to_html_node, write_markdown_html
+from blockcache import BlockCache
+from frontmatter import read_front_matter, split_front_matter
+from images import ImageSet, url_versions
+from manifest import Manifest, hash_template
+from search import PageTerms, SearchIndex, page_url
+from sitemap import count_html_words, count_words
+from template import Layouts, RefRecorder, basepath_rewriter, load_template, new_build
+from writer import OutputWriter, remove_output
+import timing
+
+# sources bigger than this are parsed and written block by block instead of whole
+STREAM_THRESHOLD = 16 * 1024 * 1024
+
+# shared by every page this process renders, see enable_block_cache
+BLOCK_CACHE = None
+
+# static url -> fingerprinted url, see enable_fingerprints
+ASSETS = {}
+_asset_pairs = ()
+# static url -> size and variants of a processed image, see enable_images
+IMAGES = {}
+_image_set = ImageSet()
+# static url -> everything about it a page embeds, compared by incremental builds
+_url_versions = {}
+# see enable_minify
+MINIFY = False
+MINIFY_REPORT = False
+# source -> title and word count of the pages rendered since the last drain_pages,
+# kept in the manifest for sitemap.py
+_page_meta = {}
+# see enable_search; source -> its search terms, drained the same way
+SEARCH = False
+_search_entries = {}
+# build pages with draft: true in their front matter, see enable_drafts
+DRAFTS = False
 
 
 def extract_title(markdown):
-    lines = markdown.split("\n")
+    # the first line starting "# ", found without splitting the document into
+    # lines: the scan stops there, usually within the first few bytes
+    if markdown.startswith("# "):
+        start = 0
+    else:
+        start = markdown.find("\n# ") + 1
+        if start == 0:
+            raise Exception("no title!")
+    end = markdown.find("\n", start)
+    return markdown[start:end if end >= 0 else None].lstrip("# ")
+
+def extract_title_from_lines(lines):
     for line in lines:
         if line.startswith("# "):
-            return line.lstrip("# ")
+            return line.rstrip("\n").lstrip("# ")
     raise Exception("no title!")
 
-def generate_page(from_path, template_path, dest_path, basepath="/"):
-    print(f"generating from {from_path} to {dest_path} using {template_path}")
+def generate_page(from_path, template_path, dest_path, basepath="/", writer=None):
+    # with a writer the finished page is queued for it, otherwise written here.
+    # returns the site urls the page points at, for the dependency graph
+    return generate_page_targets(from_path, template_path, [(dest_path, basepath)], writer)[0]
+
+def generate_page_targets(from_path, template_path, targets, writer=None):
+    # the page is parsed once and serialized once per (dest_path, basepath)
+    # target, returns the refs of each target in order
+    dests = ", ".join(dest_path for dest_path, _ in targets)
+    print(f"generating from {from_path} to {dests} using {template_path}")
+    with timing.page(from_path):
+        template = load_template(template_path)
+        if os.path.getsize(from_path) > STREAM_THRESHOLD:
+            # nothing is kept between blocks, so each target streams the source again.
+            # the first one also feeds the search terms
+            terms = PageTerms() if SEARCH else None
+            return [
+                generate_page_streaming(
+                    from_path, template, dest_path, basepath, writer, terms if i == 0 else None
+                )
+                for i, (dest_path, basepath) in enumerate(targets)
+            ]
+
+        with timing.stage("read"):
+            with open(from_path) as from_file:
+                mdfile = from_file.read()
+        # a title in the front matter wins over the first heading
+        meta, mdfile = split_front_matter(mdfile, from_path)
+        with timing.stage("parse"):
+            node = markdown_to_html_node(mdfile, BLOCK_CACHE)
+        if "title" not in meta:
+            # the first line starting "# ", as a streamed page finds it
+            with timing.stage("title"):
+                meta["title"] = extract_title(mdfile)
+        title = meta["title"]
+        refs = [
+            render_page(node, title, template, dest_path, basepath, writer)
+            for dest_path, basepath in targets
+        ]
+        # after rendering, so every cached block has its html to be read from
+        with timing.stage("meta"):
+            meta["words"] = count_words(node)
+        _page_meta[from_path] = meta
+        if SEARCH:
+            with timing.stage("search"):
+                terms = PageTerms()
+                terms.feed_node(node)
+                _search_entries[from_path] = terms.entry(title)
+        return refs
+
+def render_page(node, title, template, dest_path, basepath="/", writer=None):
+    rewrite_url = basepath_rewriter(basepath, _asset_pairs, MINIFY, _image_set)
+    # the refs are the urls handed to rewrite_url as the page is written
+    recorder = RefRecorder(rewrite_url)
+
+    def content(write):
+        with timing.stage("to_html"):
+            node.render(write, recorder)
+
+    parts = []
+    with timing.stage("template"):
+        template.render(parts.append, {"Title": title, "Content": content}, recorder)
+    html = "".join(parts)
+    if MINIFY_REPORT:
+        report_minified(html, template, title, node, basepath, dest_path)
+    with timing.stage("write"):
+        data = html.encode("utf-8")
+        if writer is None:
+            OutputWriter(threads=0).write(dest_path, data)
+        else:
+            writer.submit(dest_path, data)
+    return sorted(recorder.refs)
+
+def generate_page_streaming(from_path, template, dest_path, basepath="/", writer=None, terms=None):
+    # peak memory stays at one block: the source is read once for the title
+    # and streamed again for every {{ Content }} slot in the template.
+    # the words are counted, and terms, if given, is fed as the content goes by
+    rewrite_url = basepath_rewriter(basepath, _asset_pairs, MINIFY, _image_set)
+    recorder = RefRecorder(rewrite_url)
+    fields, skip = read_front_matter(from_path)
+    title = fields.get("title")
+    if title is None:
+        with open(from_path) as from_file:
+            title = extract_title_from_lines(islice(from_file, skip, None))
+    words = 0
+
+    def content(write):
+        def feed(chunk):
+            nonlocal words
+            words += count_html_words(chunk)
+            if terms is not None:
+                terms.feed_html(chunk)
+            write(chunk)
+        stream_content(from_path, feed, recorder, skip)
+
+    # too big to queue, so written here even when there is a writer
+    if writer is None:
+        writer = OutputWriter(threads=0)
+    with timing.stage("to_html"):
+        with writer.replace(dest_path) as dest:
+            template.render(dest.write, {"Title": title, "Content": content}, recorder)
+    _page_meta[from_path] = dict(fields, title=title, words=words)
+    if terms is not None:
+        _search_entries[from_path] = terms.entry(title)
+    return sorted(recorder.refs)
+
+def report_minified(html, template, title, node, basepath, dest_path):
+    # renders the page a second time without minifying, only to measure it
+    rewrite_url = basepath_rewriter(basepath, _asset_pairs, False, _image_set)
+    parts = []
+    content = lambda write: node.render(write, rewrite_url)
+    template.render(parts.append, {"Title": title, "Content": content}, rewrite_url)
+    before = len("".join(parts).encode("utf-8"))
+    after = len(html.encode("utf-8"))
+    saved = before - after
+    print(f"minified {dest_path}: {before} -> {after} bytes, {saved} saved ({saved / before:.0%})")
+
+def stream_content(from_path, write, rewrite_url=None, skip=0):
+    # skip: lines of front matter before the markdown
     with open(from_path) as from_file:
-        mdfile = from_file.read()
-    with open(template_path) as template_file:
-        tfile = template_file.read()
-    html = markdown_to_html_node(mdfile).to_html()
-    title = extract_title(mdfile)
-    tf = tfile.replace("{{ Title }}", title)
-    cf = tf.replace("{{ Content }}", html)
-    bf = cf.replace(f"href=\"/", f"href=\"{basepath}")
-    nf = bf.replace(f"src=\"/", f"src=\"{basepath}")
-
-    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
-    
-    with open(dest_path, "w") as dest:
-        dest.write(nf)
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath="/"):
-    content_files = os.listdir(dir_path_content)
-    
-    for f in content_files:
-        if os.path.isfile(os.path.join(dir_path_content, f)):
+        write_markdown_html(islice(from_file, skip, None), write, rewrite_url)
+
+def find_pages(dir_path_content, dest_dir_path):
+    pages = []
+    for f in sorted(os.listdir(dir_path_content)):
+        from_path = os.path.join(dir_path_content, f)
+        if os.path.isfile(from_path):
             if f.endswith(".md"):
-                generate_page(
-                    os.path.join(dir_path_content, f),
-                    template_path,
-                    os.path.join(dest_dir_path, f.rstrip(".md") + ".html"),
-                    basepath
-                )
+                pages.append((from_path, os.path.join(dest_dir_path, f[:-3] + ".html")))
         else:
-            generate_pages_recursive(
-                os.path.join(dir_path_content, f),
-                template_path,
-                os.path.join(dest_dir_path, f),
-                basepath
-            )
\ No newline at end of file
+            pages.extend(find_pages(from_path, os.path.join(dest_dir_path, f)))
+    return pages
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath="/", jobs=1):
+    new_build()
+    fields = scan_front_matter(dir_path_content)
+    pages = list_pages(dir_path_content, dest_dir_path, fields)
+    templates = select_templates(pages, dir_path_content, template_path, fields)
+    return generate_pages(pages, template_path, basepath, jobs, templates)
+
+def scan_front_matter(dir_path_content):
+    # source -> its front matter fields; only the front matter of each page is read, never its body
+    with timing.stage("front matter"):
+        return {from_path: read_front_matter(from_path)[0] for from_path, _ in find_pages(dir_path_content, "")}
+
+def list_pages(dir_path_content, dest_dir_path, fields=None):
+    # find_pages without the drafts
+    if fields is None:
+        fields = scan_front_matter(dir_path_content)
+    return [
+        (f, d) for f, d in find_pages(dir_path_content, dest_dir_path) if DRAFTS or fields[f].get("draft") is not True
+    ]
+
+def select_templates(pages, dir_path_content, template_path, fields):
+    # source -> the template it is rendered with, see template.Layouts
+    layouts = Layouts(template_path, dir_path_content)
+    return {from_path: layouts.select(from_path, fields.get(from_path)) for from_path, _ in pages}
+
+def generate_pages(pages, template_path, basepath="/", jobs=1, templates=None):
+    # returns {source: site urls it points at}
+    refs = generate_targets([(f, [(d, basepath)]) for f, d in pages], template_path, jobs, templates)
+    return {from_path: refs[dest_path] for from_path, dest_path in pages}
+
+def generate_targets(pages, template_path, jobs=1, templates=None):
+    # pages: [(source, [(dest_path, basepath), ...])], returns {dest_path: refs}.
+    # templates: source -> template, for pages not rendered with template_path
+    templates = templates or {}
+    refs = {}
+    if jobs <= 1 or len(pages) <= 1:
+        # pool workers each write their own pages, here a writer thread does
+        with OutputWriter() as writer:
+            for from_path, targets in pages:
+                template = templates.get(from_path, template_path)
+                target_refs = generate_targets_checked(from_path, template, targets, writer)
+                refs.update(zip([d for d, _ in targets], target_refs))
+        return refs
+    # multiprocessing is slow to import and serial builds never need it
+    from concurrent.futures import ProcessPoolExecutor
+
+    profiling = timing.PROFILER is not None
+    cache_settings = None
+    if BLOCK_CACHE is not None:
+        cache_settings = (BLOCK_CACHE.maxsize, BLOCK_CACHE.cache_dir)
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(pages)),
+        initializer=init_worker,
+        initargs=(profiling, cache_settings, ASSETS, IMAGES, (MINIFY, MINIFY_REPORT), SEARCH),
+    ) as pool:
+        futures = [
+            pool.submit(generate_page_in_worker, from_path, templates.get(from_path, template_path), targets)
+            for from_path, targets in pages
+        ]
+        try:
+            for (_, targets), future in zip(pages, futures):
+                target_refs, records, cache_stats, (page_meta, search_entries) = future.result()
+                refs.update(zip([d for d, _ in targets], target_refs))
+                _page_meta.update(page_meta)
+                _search_entries.update(search_entries)
+                if profiling:
+                    timing.PROFILER.merge(records)
+                if cache_stats is not None:
+                    BLOCK_CACHE.merge(cache_stats)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    return refs
+
+def generate_page_checked(from_path, template_path, dest_path, basepath="/", writer=None):
+    return generate_targets_checked(from_path, template_path, [(dest_path, basepath)], writer)[0]
+
+def generate_targets_checked(from_path, template_path, targets, writer=None):
+    # tracebacks from pool workers lose their context, so name the page up front
+    try:
+        return generate_page_targets(from_path, template_path, targets, writer)
+    except Exception as e:
+        raise Exception(f"failed to generate {from_path}: {e}") from e
+
+def enable_block_cache(maxsize=4096, cache_dir=None):
+    global BLOCK_CACHE
+    BLOCK_CACHE = BlockCache(maxsize, cache_dir)
+    return BLOCK_CACHE
+
+def enable_fingerprints(assets):
+    # pages link to the fingerprinted names static.sync_static wrote
+    global ASSETS, _asset_pairs
+    ASSETS = dict(assets)
+    _asset_pairs = tuple(sorted(ASSETS.items()))
+    update_url_versions()
+
+def enable_images(images):
+    # images: from images.process_images, the <img> tags pointing at them are
+    # annotated as they are written
+    global IMAGES, _image_set
+    IMAGES = dict(images)
+    _image_set = ImageSet(IMAGES)
+    update_url_versions()
+
+def enable_minify(report=False, enabled=True):
+    global MINIFY, MINIFY_REPORT
+    MINIFY = enabled
+    MINIFY_REPORT = enabled and report
+
+def enable_search(enabled=True):
+    # pages hand their search terms to generate_sites_incremental, see search.py
+    global SEARCH
+    SEARCH = enabled
+
+def enable_drafts(enabled=True):
+    global DRAFTS
+    DRAFTS = enabled
+
+def drain_pages():
+    # (metadata, search terms) of the pages rendered since the last call
+    drained = dict(_page_meta), dict(_search_entries)
+    _page_meta.clear()
+    _search_entries.clear()
+    return drained
+
+def update_url_versions():
+    global _url_versions
+    _url_versions = url_versions(ASSETS, IMAGES)
+
+def init_worker(profiling, cache_settings, assets=None, images=None, minify=(False, False), search=False):
+    timing.init_worker(profiling)
+    if cache_settings is not None:
+        enable_block_cache(*cache_settings)
+    if assets:
+        enable_fingerprints(assets)
+    if images:
+        enable_images(images)
+    if minify[0]:
+        enable_minify(minify[1])
+    enable_search(search)
+
+def generate_page_in_worker(from_path, template_path, targets):
+    # pool workers send their profile records, cache counters, metadata and
+    # search terms back per page
+    refs = generate_targets_checked(from_path, template_path, targets)
+    cache_stats = BLOCK_CACHE.drain() if BLOCK_CACHE is not None else None
+    return refs, timing.drain(), cache_stats, drain_pages()
+
+def generate_pages_incremental(dir_path_content, template_path, dest_dir_path, basepath="/", jobs=1):
+    generate_sites_incremental(dir_path_content, template_path, [(dest_dir_path, basepath)], jobs)
+
+def generate_sites_incremental(dir_path_content, template_path, sites, jobs=1):
+    # sites: [(dest_dir_path, basepath)], each with its own manifest. a page
+    # that is out of date in several sites is still only parsed once. each
+    # page is compared with the hash of its own template, so an edit to one
+    # template re-renders only the pages that use it
+    new_build()
+    fields = scan_front_matter(dir_path_content)
+    templates = select_templates(list_pages(dir_path_content, "", fields), dir_path_content, template_path, fields)
+    template_hashes = {}
+    for path in set(templates.values()):
+        template = load_template(path)
+        template_hashes[path] = (hash_template(path, MINIFY, template.files[1:]), template.files)
+    builds = []
+    work = {}
+    with timing.stage("manifest"):
+        for dest_dir_path, basepath in sites:
+            manifest = Manifest.load(dest_dir_path)
+            search = SearchIndex.load(dest_dir_path) if SEARCH else None
+            pages = list_pages(dir_path_content, dest_dir_path, fields)
+            dirty = []
+            for from_path, dest_path in pages:
+                source_hash, st = manifest.source_hash(from_path)
+                template_hash, template_files = template_hashes[templates[from_path]]
+                if (
+                    manifest.is_dirty(from_path, dest_path, source_hash, template_hash, basepath, _url_versions)
+                    # built before --search was on
+                    or (search is not None and from_path not in search.pages)
+                ):
+                    dirty.append((from_path, dest_path, st, source_hash))
+                    work.setdefault(from_path, []).append((dest_path, basepath))
+                else:
+                    manifest.record(
+                        from_path,
+                        dest_path,
+                        st,
+                        source_hash,
+                        template_hash,
+                        basepath,
+                        None,
+                        _url_versions,
+                        None,
+                        template_files,
+                    )
+            builds.append((dest_dir_path, basepath, manifest, search, pages, dirty))
+
+    # a failed render raises before any manifest is saved, so it is retried next run
+    refs = generate_targets(list(work.items()), template_path, jobs, templates)
+    page_meta, search_entries = drain_pages()
+    for dest_dir_path, basepath, manifest, search, pages, dirty in builds:
+        for from_path, dest_path, st, source_hash in dirty:
+            template_hash, template_files = template_hashes[templates[from_path]]
+            manifest.record(
+                from_path,
+                dest_path,
+                st,
+                source_hash,
+                template_hash,
+                basepath,
+                refs[dest_path],
+                _url_versions,
+                page_meta[from_path],
+                template_files,
+            )
+
+        sources = {from_path for from_path, _ in pages}
+        removed = 0
+        for src in manifest.stale(sources):
+            entry = manifest.forget(src)
+            if remove_output(entry["output"], dest_dir_path):
+                print(f"removed {entry['output']} ({src} is gone)")
+                removed += 1
+
+        manifest.save()
+        site = f"{dest_dir_path}: " if len(sites) > 1 else ""
+        print(f"{site}{len(dirty)} generated, {len(pages) - len(dirty)} unchanged, {removed} removed")
+        if search is not None:
+            with timing.stage("search"):
+                update_search(search, search_entries, dirty, sources, dest_dir_path, basepath, site)
+
+def update_search(search, entries, dirty, sources, dest_dir_path, basepath="/", site=""):
+    for from_path, dest_path, _, _ in dirty:
+        search.update(from_path, page_url(dest_path, dest_dir_path, basepath), entries[from_path])
+    search.forget(sources)
+    written, unchanged = search.write()
+    search.save()
+    print(f"{site}search: {len(search.pages)} pages, {written} shards written, {unchanged} unchanged")
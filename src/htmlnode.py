@@ -1,35 +1,87 @@
+import re
+
+from minify import VOID, attr
+
+URL_ATTRS = ("href", "src")
+# a site url in the href/src of raw html, in markdown text or a template
+RAW_URL_ATTR = re.compile(r'((?:href|src)=")(/[^"]*)')
+
+
 class HTMLNode:
+    # one node per inline span on every page, so no per-instance __dict__, and
+    # only the fields every node has: a leaf adds its value, a parent its children
+    __slots__ = ("tag", "props")
+
+    def __new__(cls, *args, **kwargs):
+        # HTMLNode(...) itself makes a GenericNode, the subclass with all four fields
+        return super().__new__(GenericNode if cls is HTMLNode else cls)
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def to_html(self, rewrite_url=None):
+        parts = []
+        self.render(parts.append, rewrite_url)
+        return "".join(parts)
+
+    def write_html(self, fp, rewrite_url=None):
+        self.render(fp.write, rewrite_url)
+
+    # every node writes its fragments straight into the caller's sink instead of
+    # returning strings, so a tree is serialized in one pass with no re-copying.
+    # rewrite_url, if given, maps each href/src value as it is written
+    def render(self, write, rewrite_url=None):
         raise NotImplementedError
 
-    def props_to_html(self):
-        s = ""
-        if self.props == None:
-            return s
-        for p in self.props.items():
-            s += f' {p[0]}="{p[1]}"'
-        return s
+    def props_to_html(self, rewrite_url=None):
+        if not self.props:
+            return ""
+        if rewrite_url is None:
+            return "".join([f' {k}="{v}"' for k, v in self.props.items()])
+        minify = getattr(rewrite_url, "minify", False)
+        return "".join([
+            attr(k, rewrite_url(v) if k in URL_ATTRS else v, minify) for k, v in self.props.items()
+        ])
 
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
 
 
+class GenericNode(HTMLNode):
+    __slots__ = ("value", "children")
+
+
 class LeafNode(HTMLNode):
+    __slots__ = ("value",)
+    children = None
+
     def __init__(self, tag, value, props=None):
-        super().__init__(tag, value, props=props)
+        self.tag = tag
+        self.value = value
+        self.props = props
 
-    def to_html(self):
+    def render(self, write, rewrite_url=None):
         if self.value == None:
             raise ValueError("need a value")
+        value = self.value
+        if rewrite_url is not None and self.tag != "code" and "<" in value:
+            # raw html in the markdown gets its urls rewritten like the nodes' own
+            value = RAW_URL_ATTR.sub(lambda m: m.group(1) + rewrite_url(m.group(2)), value)
         if self.tag == None:
-            return self.value
-        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
+            write(value)
+            return
+        props = self.props_to_html(rewrite_url)
+        if self.tag == "img" and self.props:
+            images = getattr(rewrite_url, "images", None)
+            if images:
+                props += images.attrs(self.props.get("src"), self.props, rewrite_url)
+        if self.tag in VOID and getattr(rewrite_url, "minify", False):
+            write(f"<{self.tag}{props}>")
+            return
+        write(f"<{self.tag}{props}>{value}</{self.tag}>")
 
     # TODO write test
     def __repr__(self):
@@ -37,19 +89,24 @@ class LeafNode(HTMLNode):
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ("children",)
+    value = None
+
     def __init__(self, tag, children, props=None):
-        super().__init__(tag, children=children, props=props)
+        self.tag = tag
+        self.children = children
+        self.props = props
 
-    def to_html(self):
+    def render(self, write, rewrite_url=None):
         if self.tag == None:
             raise ValueError("need a tag")
         if self.children == None or self.children == []:
             raise ValueError("need children")
 
-        s = ""
+        write(f"<{self.tag}{self.props_to_html(rewrite_url)}>")
         for child in self.children:
-            s += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{s}</{self.tag}>"
+            child.render(write, rewrite_url)
+        write(f"</{self.tag}>")
 
     # TODO write test
     def __repr__(self):
@@ -0,0 +1,245 @@
+# responsive images behind --images: every picture under static/ gets resized
+# variants written next to it in docs/, and each <img> pointing at one is given
+# srcset, width/height and loading="lazy" as its page is written.
+# resizing needs Pillow; without it pages still get dimensions and lazy loading
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+
+from manifest import hash_file
+from minify import attr
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_INDEX = ".images.json"
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+DEFAULT_WIDTHS = (480, 960, 1440)
+FINGERPRINT_LENGTH = 10
+
+# attributes, then the "/" of a self-closing <img ... />
+_IMG = re.compile(r"<img\b([^>]*?)(\s*/?)>")
+_SRC = re.compile(r'\ssrc=(?:"([^"]*)"|([^\s">]+))')
+_ATTR_NAME = re.compile(r"\s([\w:-]+)=")
+
+
+def image_size(path):
+    # (width, height) from the file header, None for formats we can't read
+    with open(path, "rb") as f:
+        head = f.read(32)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return struct.unpack("<HH", head[6:10])
+        if head.startswith(b"\xff\xd8"):
+            return jpeg_size(f)
+    return None
+
+
+def jpeg_size(f):
+    # walk the segment headers up to the first start-of-frame
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        (length,) = struct.unpack(">H", f.read(2))
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">xHH", f.read(5))
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def variant_name(rel, width, source_hash):
+    # images/a.png -> images/a-480w.<hash>.png, so a variant's url never changes meaning
+    stem, ext = os.path.splitext(rel)
+    return f"{stem}-{width}w.{source_hash[:FINGERPRINT_LENGTH]}{ext}"
+
+
+def make_variants(src_path, rel, source_hash, store, widths):
+    # runs on the thread pool: Pillow drops the GIL while it resizes and encodes
+    size = image_size(src_path)
+    if size is None and Image is not None:
+        with Image.open(src_path) as im:
+            size = im.size
+    entry = {"hash": source_hash, "width": None, "height": None, "variants": []}
+    if size is None:
+        return entry
+    entry["width"], entry["height"] = size
+    if Image is None:
+        return entry
+    for width in sorted(widths):
+        if width >= size[0]:
+            break
+        out_rel = variant_name(rel, width, source_hash)
+        out_path = os.path.join(store, out_rel)
+        if not os.path.exists(out_path):
+            with Image.open(src_path) as im:
+                height = round(size[1] * width / size[0])
+                resized = im.resize((width, height), Image.LANCZOS)
+                os.makedirs(os.path.dirname(out_path), exist_ok=True)
+                tmp = out_path + ".tmp"
+                resized.save(tmp, format=im.format, optimize=True, quality=80)
+                os.replace(tmp, out_path)
+        entry["variants"].append([out_rel, width])
+    return entry
+
+
+def process_images(src, dst, widths=DEFAULT_WIDTHS, jobs=1, cache_dir=None):
+    # returns {"/images/a.png": entry} for every image under src. variants are
+    # made in cache_dir (or straight in dst) once per source hash and width
+    index_path = os.path.join(dst, IMAGE_INDEX)
+    try:
+        with open(index_path) as f:
+            old = json.load(f)
+    except (FileNotFoundError, ValueError):
+        old = {}
+    store = os.path.join(cache_dir, "images") if cache_dir else dst
+
+    index = {}
+    pending = []
+    for dirpath, dirnames, filenames in os.walk(src):
+        dirnames.sort()
+        for f in sorted(filenames):
+            if not f.lower().endswith(IMAGE_EXTS):
+                continue
+            src_path = os.path.join(dirpath, f)
+            rel = os.path.relpath(src_path, src)
+            st = os.stat(src_path)
+            entry = old.get(rel)
+            if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+                source_hash = entry["hash"]
+            else:
+                source_hash = hash_file(src_path)
+            if (
+                entry
+                and entry["hash"] == source_hash
+                and entry.get("widths") == sorted(widths)
+                and all(os.path.exists(os.path.join(store, v)) for v, _ in entry["variants"])
+            ):
+                index[rel] = entry
+            else:
+                pending.append((src_path, rel, source_hash, st))
+
+    # imported here: genpage loads this module for every build, --images or not
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = [
+            (rel, st, pool.submit(make_variants, src_path, rel, source_hash, store, widths))
+            for src_path, rel, source_hash, st in pending
+        ]
+        for rel, st, future in futures:
+            entry = future.result()
+            entry.update(size=st.st_size, mtime=st.st_mtime_ns, widths=sorted(widths))
+            index[rel] = entry
+
+    # put the variants in place and drop the ones no image uses any more
+    wanted = {v for entry in index.values() for v, _ in entry["variants"]}
+    for rel in wanted:
+        out_path = os.path.join(dst, rel)
+        if store != dst and not os.path.exists(out_path):
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            shutil.copy2(os.path.join(store, rel), out_path)
+    for entry in old.values():
+        for v, _ in entry["variants"]:
+            if v not in wanted and os.path.exists(os.path.join(dst, v)):
+                os.remove(os.path.join(dst, v))
+
+    os.makedirs(dst, exist_ok=True)
+    tmp = index_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(tmp, index_path)
+    made = sum(len(index[rel]["variants"]) for _, rel, _, _ in pending)
+    print(f"images: {len(index)} images, {len(pending)} processed, {made} variants made")
+    return load_images(dst)
+
+
+class ImageSet:
+    # the processed images as a url rewriter carries them (see basepath_rewriter):
+    # each <img> node pointing at one is given srcset, width/height and
+    # loading="lazy" as it is written. hashable by version, which also goes into
+    # the rewriter's cache key, so cached blocks are redone when an image changes
+    def __init__(self, images=None):
+        # static url -> (width, height, ((variant url, width), ...))
+        self.entries = {
+            url: (entry["width"], entry["height"], tuple(("/" + v.replace(os.sep, "/"), w) for v, w in entry["variants"]))
+            for url, entry in (images or {}).items()
+            if entry["width"] is not None
+        }
+        self.version = hashlib.sha1(repr(sorted(self.entries.items())).encode()).hexdigest()[:12]
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    def __eq__(self, other):
+        return isinstance(other, ImageSet) and self.version == other.version
+
+    def __hash__(self):
+        return hash(self.version)
+
+    def attrs(self, src, present, rewrite_url):
+        # the extra attributes of an <img> whose src (as the page has it, before
+        # rewriting) is a processed image; present: the attributes it already has
+        entry = self.entries.get(src)
+        if entry is None:
+            return ""
+        width, height, variants = entry
+        # a RefRecorder's own rewriter: variants are not the page's refs
+        rewrite = getattr(rewrite_url, "rewrite_url", rewrite_url) or (lambda u: u)
+        minify = getattr(rewrite_url, "minify", False)
+        extra = []
+        if variants:
+            candidates = [f"{rewrite(v)} {w}w" for v, w in variants]
+            candidates.append(f"{rewrite(src)} {width}w")
+            extra.append(attr("srcset", ", ".join(candidates)))
+            extra.append(attr("sizes", f"(max-width: {width}px) 100vw, {width}px"))
+        if "width" not in present:
+            extra.append(attr("width", str(width), minify))
+            extra.append(attr("height", str(height), minify))
+        if "loading" not in present:
+            extra.append(attr("loading", "lazy", minify))
+        return "".join(extra)
+
+    def annotate(self, html, rewrite_url):
+        # the same for the <img> tags in a template's text, before its urls are rewritten
+        def annotate(m):
+            attrs, end = m.groups()
+            src = _SRC.search(attrs)
+            if src is None:
+                return m.group(0)
+            present = {name.lower() for name in _ATTR_NAME.findall(attrs)}
+            extra = self.attrs(src.group(1) or src.group(2), present, rewrite_url)
+            return f"<img{attrs}{extra}{end}>"
+
+        return _IMG.sub(annotate, html)
+
+
+def url_versions(assets, images):
+    # what a static url turns into on a page (fingerprinted name, size and
+    # variants), for incremental builds to compare with what a page last got
+    versions = {
+        url: f"{entry['width']}x{entry['height']} " + " ".join(v for v, _ in entry["variants"])
+        for url, entry in images.items()
+    }
+    for url, fingerprinted in assets.items():
+        versions[url] = f"{fingerprinted} {versions[url]}" if url in versions else fingerprinted
+    return versions
+
+
+def load_images(dst):
+    # the result of the last process_images into dst
+    try:
+        with open(os.path.join(dst, IMAGE_INDEX)) as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return {"/" + rel.replace(os.sep, "/"): entry for rel, entry in index.items()}
@@ -1,52 +1,308 @@
-from textnode import TextNode, TextType
-from genpage import generate_page, generate_pages_recursive
-import os, shutil, sys
-
-if len(sys.argv) > 1:
-    basepath = sys.argv[1]
-else:
-    basepath = "/"
-
-print(f"!!!!!!!!!!!! {basepath} !!!!!!!!")
-dir_path_static = "./static"
-dir_path_public = "./docs"
-dir_path_content = "./content"
-template_path = "./template.html"
-
-def main():
-    copy_static(dir_path_static, dir_path_public)
+# python3 src/main.py [basepath] builds ./content into ./docs. the same build
+# is there for other code as build(BuildConfig(...)): importing this module does
+# nothing, the build modules are imported by the first build, and a process
+# that builds again keeps the compiled template and block cache warm
+import os
+import time
+
+
+class BuildConfig:
+    def __init__(
+        self,
+        basepath="/",
+        sites=None,
+        content="./content",
+        static="./static",
+        template="./template.html",
+        public="./docs",
+        clean=False,
+        jobs=1,
+        checksum=False,
+        link=True,
+        block_cache=0,
+        cache_dir=None,
+        fingerprint=False,
+        images=False,
+        compress=False,
+        gzip_level=9,
+        brotli_quality=11,
+        compress_min_size=None,
+        minify=False,
+        minify_report=False,
+        search=False,
+        drafts=False,
+        site_url=None,
+        profile=False,
+        profile_json=None,
+        profile_top=10,
+    ):
+        self.basepath = basepath
+        # (output dir, basepath) for every site this build writes
+        self.sites = list(sites) if sites else [(public, basepath)]
+        dirs = [os.path.normpath(dest_dir) for dest_dir, _ in self.sites]
+        if len(set(dirs)) != len(dirs):
+            # the sites would share one manifest and overwrite each other's pages
+            raise ValueError(f"two sites write to the same directory: {dirs}")
+        self.content = content
+        self.static = static
+        self.template = template
+        self.clean = clean
+        self.jobs = jobs or os.cpu_count()
+        self.checksum = checksum
+        self.link = link
+        self.block_cache = block_cache
+        self.cache_dir = cache_dir
+        self.fingerprint = fingerprint
+        self.images = images
+        self.compress = compress
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.compress_min_size = compress_min_size
+        self.minify = minify or minify_report
+        self.minify_report = minify_report
+        self.search = search
+        self.drafts = drafts
+        self.site_url = site_url
+        self.profile = profile or bool(profile_json)
+        self.profile_json = profile_json
+        self.profile_top = profile_top
+
+    def __repr__(self):
+        return f"BuildConfig({self.sites!r}, content={self.content!r}, template={self.template!r})"
+
+
+def build(config):
+    import genpage
+    import timing
+    from manifest import load_asset_manifest
+    from static import sync_static
+
+    if config.profile:
+        timing.enable()
+    start = time.perf_counter()
+    cache = configure_block_cache(genpage, config)
+    genpage.enable_minify(config.minify_report, config.minify)
+    genpage.enable_search(config.search)
+    genpage.enable_drafts(config.drafts)
+    for dest_dir, _ in config.sites:
+        with timing.stage("static"):
+            sync_static(
+                config.static,
+                dest_dir,
+                clean=config.clean,
+                checksum=config.checksum,
+                link=config.link,
+                fingerprint=config.fingerprint,
+            )
+        if config.images:
+            from images import process_images
+
+            with timing.stage("images"):
+                # the same for every site, only the copies differ
+                images = process_images(config.static, dest_dir, jobs=config.jobs, cache_dir=config.cache_dir)
+    # set on every build, so one build's assets never leak into the next
+    genpage.enable_fingerprints(load_asset_manifest(config.sites[0][0]) if config.fingerprint else {})
+    genpage.enable_images(images if config.images else {})
     print("~#%#~ generating pages ~#%#~")
-    generate_pages_recursive(
-        dir_path_content,
-        template_path,
-        dir_path_public,
-        basepath
-    )
-def copy_static(src, dst):
-    if not os.path.exists(src):
-        raise Exception("source directory doesnt exist")
-    srcpaths = os.listdir(src)
-    if os.path.exists(dst):
-        shutil.rmtree(dst)
-    os.mkdir(dst)
-
-    recur_cp(src, dst)
-
-def recur_cp(src, dst):
-    for item in os.listdir(src):
-        src_path = os.path.join(src, item)
-        dst_path = os.path.join(dst, item)
-        if os.path.isfile(src_path):
-            print(f"cp {src_path} to {dst_path}")
-            shutil.copy(src_path, dst_path)
-        else:
-            print(f"mkdir {dst_path}")
-            os.mkdir(dst_path)
-            recur_cp(src_path, dst_path)
-    
-    
-
-
-main()
+    genpage.generate_sites_incremental(config.content, config.template, config.sites, config.jobs)
+    if config.site_url:
+        from sitemap import write_site_files
+
+        for dest_dir, basepath in config.sites:
+            with timing.stage("sitemap"):
+                write_site_files(dest_dir, config.content, config.site_url, basepath)
+    if config.compress:
+        from compress import DEFAULT_MIN_SIZE, compress_output
+
+        min_size = DEFAULT_MIN_SIZE if config.compress_min_size is None else config.compress_min_size
+        for dest_dir, _ in config.sites:
+            with timing.stage("compress"):
+                compress_output(dest_dir, config.gzip_level, config.brotli_quality, min_size, config.jobs)
+    if cache is not None:
+        cache.save()
+        print(cache.summary())
+    if timing.PROFILER is not None:
+        wall = time.perf_counter() - start
+        print(timing.PROFILER.report(config.profile_top, wall))
+        if config.profile_json:
+            timing.PROFILER.write_json(config.profile_json, config.profile_top, wall)
+    if config.profile:
+        timing.disable()
+
+
+def configure_block_cache(genpage, config):
+    # a cache with the same settings is kept from the last build in this process
+    if config.block_cache <= 0 and not config.cache_dir:
+        genpage.BLOCK_CACHE = None
+        return None
+    maxsize = config.block_cache or 4096
+    cache = genpage.BLOCK_CACHE
+    if cache is None or (cache.maxsize, cache.cache_dir) != (maxsize, config.cache_dir):
+        cache = genpage.enable_block_cache(maxsize, config.cache_dir)
+    return cache
+
+
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="build the site from ./content into ./docs")
+    parser.add_argument("basepath", nargs="?", help="the url prefix the site is served under (default /)")
+    parser.add_argument(
+        "--target",
+        action="append",
+        default=[],
+        metavar="BASEPATH=DIR",
+        help="build the site under BASEPATH into DIR; repeat to publish the same content under "
+        "several prefixes, every page is parsed once for all of them (default: BASEPATH=./docs)",
+    )
+    parser.add_argument(
+        "--clean",
+        action="store_true",
+        help="delete ./docs first and build everything from scratch; without it only new or changed "
+        "pages and static files are written and deleted ones pruned",
+    )
+    # what every build does now, still accepted so older scripts keep working
+    parser.add_argument("--incremental", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="render pages on N worker processes (0 = one per CPU)",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by content hash instead of size and mtime",
+    )
+    parser.add_argument(
+        "--no-link",
+        action="store_true",
+        help="always copy static files instead of trying reflinks and hardlinks first",
+    )
+    parser.add_argument(
+        "--block-cache",
+        type=int,
+        default=0,
+        metavar="N",
+        help="reuse the rendered html of the last N distinct blocks, for sites that repeat "
+        "paragraphs across pages (e.g. 4096)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        help="keep rendered blocks on disk in DIR so they survive between builds (implies --block-cache)",
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help="write static files as name.<hash>.ext and point pages at those names, so they can be "
+        "served with long-lived cache headers",
+    )
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        help="make resized variants of static images (needs Pillow) and give <img> tags "
+        "srcset, width/height and loading=lazy",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz (and .br, with the brotli module) next to new or changed html, css and js",
+    )
+    parser.add_argument("--gzip-level", type=int, default=9, metavar="N", help="gzip level 1-9 (default 9)")
+    parser.add_argument(
+        "--brotli-quality", type=int, default=11, metavar="N", help="brotli quality 0-11 (default 11)"
+    )
+    parser.add_argument(
+        "--compress-min-size",
+        type=int,
+        metavar="BYTES",
+        help="leave files smaller than this uncompressed (default 1024)",
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="drop whitespace between tags, optional attribute quotes and comments from the output",
+    )
+    parser.add_argument(
+        "--minify-report",
+        action="store_true",
+        help="print the bytes --minify saved on each page (renders every page twice, implies --minify)",
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a search index of every page's words and headings to search/, as gzipped "
+        "json shards a client loads as they are needed",
+    )
+    parser.add_argument(
+        "--drafts",
+        action="store_true",
+        help="also build pages with draft: true in their front matter",
+    )
+    parser.add_argument(
+        "--site-url",
+        metavar="URL",
+        help="write sitemap.xml, an atom feed of blog/ (feed.xml) and pages.json, "
+        "with links under URL (e.g. https://example.com)",
+    )
+    parser.add_argument("--profile", action="store_true", help="time each build stage and print a report")
+    parser.add_argument(
+        "--profile-json",
+        metavar="PATH",
+        help="also write the profile report as JSON to PATH (implies --profile)",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        metavar="N",
+        help="how many of the slowest pages to list (default 10)",
+    )
+    args = parser.parse_args(argv)
+    for target in args.target:
+        if "=" not in target:
+            parser.error(f"--target {target}: expected BASEPATH=DIR")
+    if args.target and args.basepath is not None:
+        parser.error("with --target the basepath goes in each target, not before them")
+    dirs = [os.path.normpath(t.split("=", 1)[1]) for t in args.target]
+    for i, d in enumerate(dirs):
+        if d in dirs[:i]:
+            parser.error(f"--target {args.target[i]}: another target already writes to {d}")
+
+    return BuildConfig(
+        basepath=args.basepath or "/",
+        sites=[tuple(reversed(t.split("=", 1))) for t in args.target],
+        clean=args.clean,
+        jobs=args.jobs,
+        checksum=args.checksum,
+        link=not args.no_link,
+        block_cache=args.block_cache,
+        cache_dir=args.cache_dir,
+        fingerprint=args.fingerprint,
+        images=args.images,
+        compress=args.compress,
+        gzip_level=args.gzip_level,
+        brotli_quality=args.brotli_quality,
+        compress_min_size=args.compress_min_size,
+        minify=args.minify,
+        minify_report=args.minify_report,
+        search=args.search,
+        drafts=args.drafts,
+        site_url=args.site_url,
+        profile=args.profile,
+        profile_json=args.profile_json,
+        profile_top=args.profile_top,
+    )
+
+
+def main(argv=None):
+    config = parse_args(argv)
+    print(f"!!!!!!!!!!!! {' '.join(basepath for _, basepath in config.sites)} !!!!!!!!")
+    build(config)
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 3
+# written next to the pages with --fingerprint: {"/index.css": "/index.<hash>.css"}
+ASSET_MANIFEST = "asset-manifest.json"
+
+
+def hash_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 16):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_template(path, minify=False, partials=()):
+    # partials: the files path includes, an edit to one counts as an edit to it.
+    # a minified build renders the same template differently, so it counts as another one
+    h = hash_file(path)
+    if partials:
+        h = hashlib.sha256(" ".join([h] + [hash_file(p) for p in partials]).encode()).hexdigest()
+    return h + ("+min" if minify else "")
+
+
+class Manifest:
+    def __init__(self, path, pages=None, static=None, compressed=None):
+        self.path = path
+        self.pages = pages if pages is not None else {}
+        # files synced from static/, relative path -> size, mtime and hash
+        self.static = static if static is not None else {}
+        # outputs with sidecars, relative path -> size, mtime and the encodings written
+        self.compressed = compressed if compressed is not None else {}
+
+    @classmethod
+    def load(cls, dest_dir):
+        path = os.path.join(dest_dir, MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("pages", {}), data.get("static", {}), data.get("compressed", {}))
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            data = {
+                "version": MANIFEST_VERSION,
+                "pages": self.pages,
+                "static": self.static,
+                "compressed": self.compressed,
+            }
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def source_hash(self, src):
+        # size + mtime match means we hashed this exact file last time, skip the read
+        st = os.stat(src)
+        entry = self.pages.get(src)
+        if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+            return entry["hash"], st
+        return hash_file(src), st
+
+    def is_dirty(self, src, dest, source_hash, template_hash, basepath, assets=None):
+        return bool(self.dirty_reasons(src, dest, source_hash, template_hash, basepath, assets))
+
+    def dirty_reasons(self, src, dest, source_hash, template_hash, basepath, assets=None):
+        # assets: url -> what pages embed for it this build (fingerprinted name, image variants)
+        entry = self.pages.get(src)
+        if entry is None:
+            return ["never built"]
+        reasons = []
+        if entry["hash"] != source_hash:
+            reasons.append("source changed")
+        if entry["template"] != template_hash:
+            reasons.append("template changed")
+        if entry["basepath"] != basepath:
+            reasons.append(f"basepath changed from {entry['basepath']}")
+        if entry["output"] != dest:
+            reasons.append(f"output moved from {entry['output']}")
+        elif not os.path.exists(dest):
+            reasons.append("output missing")
+        assets = assets or {}
+        used = entry.get("assets", {})
+        for url in entry.get("refs", []):
+            if assets.get(url, url) != used.get(url, url):
+                reasons.append(f"{url} is now {assets.get(url, url)}")
+        return reasons
+
+    def record(
+        self, src, dest, st, source_hash, template_hash, basepath, refs=None, assets=None, meta=None, templates=None
+    ):
+        # refs: the site urls the page links to, and meta: its title, word count
+        # and the like; both kept from the last render if not given. templates:
+        # the template files the page is rendered with, for the dependency graph
+        previous = self.pages.get(src, {})
+        if refs is None:
+            refs = previous.get("refs", [])
+        if meta is None:
+            meta = previous.get("meta", {})
+        assets = assets or {}
+        self.pages[src] = {
+            "hash": source_hash,
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "template": template_hash,
+            "basepath": basepath,
+            "output": dest,
+            "refs": refs,
+            "assets": {url: assets[url] for url in refs if url in assets},
+            "meta": meta,
+            "templates": templates if templates is not None else previous.get("templates", []),
+        }
+
+    def stale(self, sources):
+        return [src for src in self.pages if src not in sources]
+
+    def forget(self, src):
+        return self.pages.pop(src)
+
+
+def load_asset_manifest(dest_dir):
+    try:
+        with open(os.path.join(dest_dir, ASSET_MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
@@ -0,0 +1,120 @@
+# --minify: the template is minified once when it is bound to a rewriter, and
+# the node serializer drops attribute quotes as it writes. markdown output has
+# no whitespace between tags to begin with, so nothing is re-scanned per page
+import re
+
+_TOKEN = re.compile(r"(<!--.*?-->|<[^>]*>|\{\{ \w+ \}\})", re.DOTALL)
+_TAG = re.compile(r"<(/?)([a-zA-Z][\w:-]*)(.*?)(/?)>$", re.DOTALL)
+_ATTR = re.compile(r"""\s*([^\s=/>]+)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s>]+))?""")
+_UNSAFE = re.compile(r"""[\s"'=<>`]""")
+
+_SPACE = re.compile(r"\s+")
+
+# text inside these is written exactly as it is
+VERBATIM = {"pre", "code", "textarea", "script", "style"}
+# and inside these even a "<" doesn't start a tag
+RAW_TEXT = {"script", "style"}
+VOID = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# whitespace next to these never shows, so it is dropped instead of collapsed
+BLOCK = {
+    "html", "head", "body", "title", "meta", "link", "script", "style", "article", "aside",
+    "div", "footer", "header", "main", "nav", "section", "p", "pre", "blockquote", "ul", "ol",
+    "li", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "table", "thead", "tbody", "tr", "th", "td",
+    "figure", "figcaption", "form",
+}
+
+
+def attr(name, value, minify=False):
+    if minify and value and not _UNSAFE.search(value):
+        return f" {name}={value}"
+    return f' {name}="{value}"'
+
+
+def minify_tag(token):
+    m = _TAG.match(token)
+    if m is None:
+        return token
+    closing, name, attrs, slash = m.groups()
+    if closing:
+        return f"</{name}>"
+    lower = name.lower()
+    # <path d="..."/> in svg needs its slash, and an unquoted value right before
+    # it would swallow it, so such a tag keeps its quotes
+    keep_slash = slash and lower not in VOID
+    out = [f"<{name}"]
+    for attr_name, value in _ATTR.findall(attrs):
+        if not value:
+            out.append(f" {attr_name}")
+            continue
+        if value[0] in "\"'":
+            inner = value[1:-1]
+            if keep_slash or "{{" in inner or _UNSAFE.search(inner) or not inner:
+                out.append(f" {attr_name}={value}")
+                continue
+            value = inner
+        out.append(f" {attr_name}={value}")
+    out.append("/>" if keep_slash else ">")
+    return "".join(out)
+
+
+def tag_name(token):
+    m = _TAG.match(token)
+    return (m.group(2).lower(), bool(m.group(1))) if m else (None, False)
+
+
+def minify_html(text):
+    # whitespace between tags is collapsed to one space, or dropped next to a
+    # block-level tag; comments go; {{ slots }} are left as they are
+    tokens = split_tokens(text)
+    out = []
+    verbatim = []
+    for i, token in enumerate(tokens):
+        if not i % 2:
+            if verbatim:
+                out.append(token)
+                continue
+            collapsed = _SPACE.sub(" ", token)
+            if collapsed == " ":
+                before = tag_name(tokens[i - 1])[0] if i > 0 else None
+                after = tag_name(tokens[i + 1])[0] if i + 1 < len(tokens) else None
+                if i == 0 or i == len(tokens) - 1 or before in BLOCK or after in BLOCK:
+                    continue
+            out.append(collapsed)
+            continue
+
+        if token.startswith("<!--"):
+            if verbatim or token.startswith("<!--["):
+                out.append(token)
+            continue
+        if token.startswith("{{"):
+            out.append(token)
+            continue
+        name, closing = tag_name(token)
+        if name in VERBATIM:
+            if not closing and not token.endswith("/>"):
+                verbatim.append(name)
+            elif closing and verbatim and verbatim[-1] == name:
+                verbatim.pop()
+        out.append(minify_tag(token))
+    return "".join(out)
+
+
+def split_tokens(text):
+    # [text, tag, text, tag, ..., text]; the body of a script or style is
+    # one text token, since a "<" in there doesn't start a tag
+    tokens = []
+    pos = 0
+    raw = None
+    while True:
+        start = pos
+        if raw is not None:
+            start = text.lower().find(f"</{raw}", pos)
+            start = len(text) if start < 0 else start
+        m = _TOKEN.search(text, start)
+        if m is None:
+            tokens.append(text[pos:])
+            return tokens
+        tokens += [text[pos:m.start()], m.group(0)]
+        pos = m.end()
+        name, closing = tag_name(m.group(0))
+        raw = name if name in RAW_TEXT and not closing and not m.group(0).endswith("/>") else None
@@ -0,0 +1,223 @@
+# site search behind --search: the text of each page is taken from its parsed
+# node tree while it renders, split into sections at every heading, and turned
+# into an inverted index (token -> [page id, section] postings). the index is
+# written to docs/search/ as gzipped json shards, one per token prefix, for a
+# client to fetch only the shards the query needs:
+#   search/index.json        {"prefix": 2, "pages": [[url, title, [headings]] | null], "shards": [...]}
+#   search/<prefix>.json.gz  {token: [[page id, section], ...]}
+# section 0 is the text before the first heading, section n is under headings[n].
+# the terms of every page are kept in docs/.search.json, so a build only has to
+# index the pages it rendered and only rewrites the shards whose tokens changed
+import gzip
+import heapq
+import html
+import json
+import os
+import re
+
+from blockcache import FragmentNode
+from writer import OutputWriter
+
+SEARCH_STATE = ".search.json"
+SEARCH_DIR = "search"
+SEARCH_VERSION = 2
+# tokens are sharded by their first SHARD_PREFIX characters
+SHARD_PREFIX = 2
+MAX_TOKEN = 32
+
+_WORD = re.compile(r"\w+")
+_TAG = re.compile(r"<(/?)([a-zA-Z][\w:-]*)?[^<>]*>")
+_SHARD_CHAR = re.compile(r"[^a-z0-9]")
+HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+
+def tokenize(text):
+    return [t for t in _WORD.findall(text.lower()) if 2 <= len(t) <= MAX_TOKEN]
+
+
+def shard_name(token):
+    # anything outside a-z0-9 becomes "_", so shard names are safe in a url
+    return _SHARD_CHAR.sub("_", token[:SHARD_PREFIX])
+
+
+class PageTerms:
+    # collects one page: its headings and the sections each token shows up in
+    def __init__(self):
+        self.headings = [""]
+        self.terms = {}
+        self._heading = None  # text of a heading feed_html is in the middle of
+
+    def heading(self, text):
+        self.headings.append(" ".join(text.split()))
+        self.text(text)
+
+    def text(self, text):
+        section = len(self.headings) - 1
+        for token in tokenize(text):
+            sections = self.terms.setdefault(token, [])
+            if not sections or sections[-1] != section:
+                sections.append(section)
+
+    def feed_node(self, node):
+        # the text leaves are what text_to_textnodes split each block into. a
+        # block from the block cache is read from its html (already there once
+        # the page has rendered) instead of building its node again
+        if isinstance(node, FragmentNode):
+            self.feed_html(next(iter(node.html.values()), ""))
+        elif node.tag in HEADINGS:
+            self.heading("".join(leaf_text(node)))
+        elif node.children is None:
+            self.text(node.value or "")
+        else:
+            for child in node.children:
+                self.feed_node(child)
+
+    def feed_html(self, chunk):
+        # for streamed pages and cached blocks: html in, the same sections out.
+        # a tag is never split across chunks, a heading may be
+        pos = 0
+        for m in _TAG.finditer(chunk):
+            self.feed_text(chunk[pos:m.start()])
+            pos = m.end()
+            closing, name = m.groups()
+            if name is None or name.lower() not in HEADINGS:
+                continue
+            if not closing:
+                self._heading = []
+            elif self._heading is not None:
+                self.heading("".join(self._heading))
+                self._heading = None
+        self.feed_text(chunk[pos:])
+
+    def feed_text(self, text):
+        if not text:
+            return
+        text = html.unescape(text)
+        if self._heading is not None:
+            self._heading.append(text)
+        else:
+            self.text(text)
+
+    def entry(self, title):
+        return {"title": title, "headings": self.headings, "terms": self.terms}
+
+
+def leaf_text(node):
+    if node.children is None:
+        return [node.value or ""]
+    return [text for child in node.children for text in leaf_text(child)]
+
+
+def page_url(dest_path, dest_dir, basepath="/"):
+    rel = os.path.relpath(dest_path, dest_dir).replace(os.sep, "/")
+    if rel == "index.html":
+        rel = ""
+    elif rel.endswith("/index.html"):
+        rel = rel[: -len("index.html")]
+    return basepath + rel
+
+
+class SearchIndex:
+    def __init__(self, dest_dir, pages=None, ids=None, free=None, next_id=0):
+        self.dest_dir = dest_dir
+        # source -> {"url", "title", "headings", "terms"}
+        self.pages = pages if pages is not None else {}
+        # source -> page id; ids stay put so one new page doesn't renumber every shard
+        self.ids = ids if ids is not None else {}
+        # ids of removed pages (a heap, lowest is reused first) and the next never used one
+        self.free = free if free is not None else []
+        self.next_id = next_id
+        # shards the pages updated since loading have tokens in, None for all of them
+        self.dirty = set() if pages is not None else None
+
+    @classmethod
+    def load(cls, dest_dir):
+        try:
+            with open(os.path.join(dest_dir, SEARCH_STATE)) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return cls(dest_dir)
+        if data.get("version") != SEARCH_VERSION or data.get("prefix") != SHARD_PREFIX:
+            return cls(dest_dir)
+        return cls(dest_dir, data["pages"], data["ids"], data["free"], data["next"])
+
+    def update(self, src, url, entry):
+        self.touch(src)
+        self.pages[src] = dict(entry, url=url)
+        self.touch(src)
+        if src not in self.ids:
+            if self.free:
+                self.ids[src] = heapq.heappop(self.free)
+            else:
+                self.ids[src] = self.next_id
+                self.next_id += 1
+
+    def forget(self, sources):
+        # drops every page whose source is not in sources
+        for src in [src for src in self.pages if src not in sources]:
+            self.touch(src)
+            del self.pages[src]
+            if src in self.ids:
+                heapq.heappush(self.free, self.ids.pop(src))
+
+    def touch(self, src):
+        if self.dirty is not None and src in self.pages:
+            self.dirty.update(shard_name(token) for token in self.pages[src]["terms"])
+
+    def save(self):
+        path = os.path.join(self.dest_dir, SEARCH_STATE)
+        os.makedirs(self.dest_dir, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            data = {
+                "version": SEARCH_VERSION,
+                "prefix": SHARD_PREFIX,
+                "pages": self.pages,
+                "ids": self.ids,
+                "free": self.free,
+                "next": self.next_id,
+            }
+            json.dump(data, f, sort_keys=True, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def shards(self, names):
+        # {shard name: {token: [[page id, section], ...]}} for the shards in names
+        shards = {name: {} for name in names}
+        for src, page in self.pages.items():
+            page_id = self.ids[src]
+            for token, sections in page["terms"].items():
+                shard = shards.get(shard_name(token))
+                if shard is not None:
+                    shard.setdefault(token, []).extend([page_id, section] for section in sections)
+        for shard in shards.values():
+            for postings in shard.values():
+                postings.sort()
+        return shards
+
+    def write(self):
+        # rewrites the shards whose tokens changed, returns (written, unchanged)
+        out_dir = os.path.join(self.dest_dir, SEARCH_DIR)
+        os.makedirs(out_dir, exist_ok=True)
+        on_disk = {f[: -len(".json.gz")] for f in os.listdir(out_dir) if f.endswith(".json.gz")}
+        names = {shard_name(token) for page in self.pages.values() for token in page["terms"]}
+        todo = {name for name in names if self.dirty is None or name in self.dirty or name not in on_disk}
+
+        writer = OutputWriter(threads=0)
+        for name, shard in self.shards(todo).items():
+            # mtime=0 keeps an unchanged shard byte-identical, so it isn't rewritten
+            writer.write(os.path.join(out_dir, f"{name}.json.gz"), gzip.compress(dump(shard), 9, mtime=0))
+        for name in on_disk - names:
+            os.remove(os.path.join(out_dir, f"{name}.json.gz"))
+        written = writer.written
+
+        pages = [None] * self.next_id
+        for src, page in self.pages.items():
+            pages[self.ids[src]] = [page["url"], page["title"], page["headings"]]
+        index = {"version": SEARCH_VERSION, "prefix": SHARD_PREFIX, "pages": pages, "shards": sorted(names)}
+        writer.write(os.path.join(out_dir, "index.json"), dump(index))
+        self.dirty = set()
+        return written, len(names) - written
+
+
+def dump(data):
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
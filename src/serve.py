@@ -0,0 +1,174 @@
+# dev loop: python3 src/serve.py --watch
+# builds once, serves ./docs and re-renders only what changed on disk
+import argparse
+import functools
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import genpage
+from frontmatter import read_front_matter
+from genpage import drain_pages, find_pages, generate_page_checked, generate_pages_incremental
+from manifest import Manifest, hash_template
+from static import sync_file, sync_static
+from template import Layouts, load_template, new_build
+from writer import remove_output
+
+POLL_INTERVAL = 0.1
+
+
+class Watcher:
+    def __init__(self, dir_path_content, dir_path_static, template_path, dir_path_public, basepath="/"):
+        self.content = dir_path_content
+        self.static = dir_path_static
+        self.template_path = template_path
+        self.public = dir_path_public
+        self.basepath = basepath
+        self.snapshot = {}
+        self.pages = {}
+        self.manifest = None
+        self.layouts = Layouts(template_path, dir_path_content)
+
+    def build(self):
+        sync_static(self.static, self.public)
+        generate_pages_incremental(self.content, self.template_path, self.public, self.basepath)
+        self.manifest = Manifest.load(self.public)
+        self.pages = dict(find_pages(self.content, self.public))
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        paths = list(self.template_files())
+        for root in (self.content, self.static, self.layouts.dir):
+            for dirpath, _, filenames in os.walk(root):
+                paths.extend(os.path.join(dirpath, f) for f in filenames)
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def template_files(self):
+        # the default template and every template or partial some page was rendered with
+        files = {self.template_path}
+        for entry in self.manifest.pages.values() if self.manifest else ():
+            files.update(entry.get("templates", ()))
+        return files
+
+    def is_template(self, path):
+        return path in self.template_files() or path.startswith(self.layouts.dir + os.sep)
+
+    def poll(self):
+        snapshot = self.scan()
+        previous = self.snapshot
+        changed = [p for p, stamp in snapshot.items() if previous.get(p) != stamp]
+        removed = [p for p in previous if p not in snapshot]
+        self.snapshot = snapshot
+        if not changed and not removed:
+            return False
+
+        templates = [p for p in changed + removed if self.is_template(p)]
+        if templates:
+            new_build()
+            if any(p not in previous or p in removed for p in templates):
+                # a template came or went, so any page may be rendered with another one now
+                self.layouts = Layouts(self.template_path, self.content)
+                users = list(self.pages)
+            else:
+                users = [
+                    src
+                    for src, entry in self.manifest.pages.items()
+                    if any(p in entry.get("templates", ()) for p in templates)
+                ]
+            changed = [p for p in changed if p not in templates] + users
+            removed = [p for p in removed if p not in templates]
+        for path in dict.fromkeys(changed):
+            if path.startswith(self.static + os.sep):
+                rel = os.path.relpath(path, self.static)
+                sync_file(path, os.path.join(self.public, rel), self.manifest, rel)
+            elif path.endswith(".md"):
+                self.render(path)
+        for path in removed:
+            if path.startswith(self.static + os.sep):
+                rel = os.path.relpath(path, self.static)
+                self.manifest.static.pop(rel, None)
+                remove_output(os.path.join(self.public, rel), self.public)
+            elif path in self.pages:
+                remove_output(self.pages.pop(path), self.public)
+                self.manifest.forget(path)
+        self.manifest.save()
+        return True
+
+    def render(self, from_path):
+        dest_path = self.pages.get(from_path)
+        if dest_path is None:
+            dest_path = os.path.join(self.public, os.path.relpath(from_path, self.content))[:-3] + ".html"
+            self.pages[from_path] = dest_path
+        try:
+            fields, _ = read_front_matter(from_path)
+            if not genpage.DRAFTS and fields.get("draft") is True:
+                # gone from the site, as in a full build, until draft: true is dropped
+                remove_output(dest_path, self.public)
+                self.manifest.pages.pop(from_path, None)
+                return
+            template_path = self.layouts.select(from_path, fields)
+            refs = generate_page_checked(from_path, template_path, dest_path, self.basepath)
+        except Exception as e:
+            # keep serving the last good output until the page is fixed
+            print(e)
+            return
+        source_hash, st = self.manifest.source_hash(from_path)
+        meta = drain_pages()[0].get(from_path)
+        template = load_template(template_path)
+        template_hash = hash_template(template_path, genpage.MINIFY, template.files[1:])
+        self.manifest.record(
+            from_path, dest_path, st, source_hash, template_hash, self.basepath, refs, None, meta, template.files
+        )
+
+    def watch(self):
+        while True:
+            time.sleep(POLL_INTERVAL)
+            start = time.perf_counter()
+            if self.poll():
+                print(f"rebuilt in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+
+def serve(directory, port):
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=directory)
+    server = ThreadingHTTPServer(("", port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    print(f"serving {directory} on http://localhost:{port}/")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="build ./docs and serve it locally")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="poll content/, static/ and template.html and re-render what changed",
+    )
+    args = parser.parse_args()
+
+    watcher = Watcher("./content", "./static", "./template.html", "./docs", args.basepath)
+    watcher.build()
+    server = serve(watcher.public, args.port)
+    try:
+        if args.watch:
+            watcher.watch()
+        else:
+            threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
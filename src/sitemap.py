@@ -0,0 +1,133 @@
+# page metadata and what is made from it behind --site-url: sitemap.xml, an
+# atom feed of the blog pages and pages.json. every page's title and word count
+# are taken while it renders, along with its front matter, and kept in the
+# manifest next to its hash, so these files are written from the manifest
+# alone, without opening a page. posts are dated by their front matter date,
+# or the source mtime without one
+import json
+import os
+import re
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+from blockcache import FragmentNode
+from manifest import Manifest
+from search import page_url
+from writer import OutputWriter
+
+FEED_DIR = "blog"
+FEED_LIMIT = 20
+PAGE_INDEX = "pages.json"
+
+_WORD = re.compile(r"\w+")
+_TAG = re.compile(r"<[^<>]*>")
+
+
+def count_words(node):
+    # over the text leaves; a cached block only has its html to count from
+    if isinstance(node, FragmentNode):
+        return count_html_words(next(iter(node.html.values()), ""))
+    if node.children is None:
+        return len(_WORD.findall(node.value or ""))
+    return sum(count_words(child) for child in node.children)
+
+
+def count_html_words(chunk):
+    return len(_WORD.findall(_TAG.sub(" ", chunk)))
+
+
+def page_list(manifest, dest_dir, content_dir):
+    # one dict per page, in source order
+    pages = []
+    for src, entry in sorted(manifest.pages.items()):
+        meta = entry.get("meta", {})
+        pages.append(
+            dict(
+                meta,
+                source=os.path.relpath(src, content_dir).replace(os.sep, "/"),
+                url=page_url(entry["output"], dest_dir, entry["basepath"]),
+                updated=iso_time(entry["mtime"]),
+            )
+        )
+    return pages
+
+
+def iso_time(mtime_ns):
+    return datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc).replace(microsecond=0).isoformat()
+
+
+def published(page):
+    # the front matter date if there is one, as an atom timestamp
+    date = page.get("date")
+    if not isinstance(date, str) or not date:
+        return page["updated"]
+    if len(date) == 10:
+        return date + "T00:00:00+00:00"
+    return date
+
+
+def weight(page):
+    w = page.get("weight", 0)
+    return w if isinstance(w, (int, float)) and not isinstance(w, bool) else 0
+
+
+def absolute(site_url, url):
+    # urls already carry the basepath
+    return site_url.rstrip("/") + url
+
+
+def sitemap_xml(pages, site_url):
+    out = ['<?xml version="1.0" encoding="UTF-8"?>\n']
+    out.append('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+    for page in pages:
+        out.append(
+            f"<url><loc>{escape(absolute(site_url, page['url']))}</loc>"
+            f"<lastmod>{page['updated']}</lastmod></url>\n"
+        )
+    out.append("</urlset>\n")
+    return "".join(out)
+
+
+def feed_xml(pages, site_url, title, feed_url, limit=FEED_LIMIT):
+    # pages: already the feed's pages, newest first
+    pages = pages[:limit]
+    updated = max((published(p) for p in pages), default=iso_time(0))
+    out = ['<?xml version="1.0" encoding="UTF-8"?>\n']
+    out.append('<feed xmlns="http://www.w3.org/2005/Atom">\n')
+    out.append(f"<title>{escape(title)}</title>\n")
+    out.append(f"<id>{escape(absolute(site_url, feed_url))}</id>\n")
+    out.append(f'<link rel="self" href="{escape(absolute(site_url, feed_url))}"/>\n')
+    out.append(f"<updated>{updated}</updated>\n")
+    out.append(f"<author><name>{escape(title)}</name></author>\n")
+    for page in pages:
+        link = escape(absolute(site_url, page["url"]))
+        out.append(
+            f"<entry><title>{escape(page.get('title', ''))}</title>"
+            f'<link href="{link}"/><id>{link}</id>'
+            f"<updated>{published(page)}</updated></entry>\n"
+        )
+    out.append("</feed>\n")
+    return "".join(out)
+
+
+def write_site_files(dest_dir, content_dir, site_url, basepath="/", feed_dir=FEED_DIR):
+    # writes sitemap.xml, feed.xml and pages.json into dest_dir from its manifest.
+    # a file whose bytes didn't change is left alone
+    pages = page_list(Manifest.load(dest_dir), dest_dir, content_dir)
+    # blog/post.md and blog/post/index.md are posts, blog/index.md is the listing
+    feed = [
+        p for p in pages if p["source"].startswith(feed_dir + "/") and p["source"] != f"{feed_dir}/index.md"
+    ]
+    feed.sort(key=published, reverse=True)
+    home = next((p for p in pages if p["source"] == "index.md"), None)
+    title = home["title"] if home and home.get("title") else site_url
+
+    writer = OutputWriter(threads=0)
+    writer.write(os.path.join(dest_dir, "sitemap.xml"), sitemap_xml(pages, site_url).encode("utf-8"))
+    feed_url = basepath + "feed.xml"
+    writer.write(os.path.join(dest_dir, "feed.xml"), feed_xml(feed, site_url, title, feed_url).encode("utf-8"))
+    pages.sort(key=lambda p: (weight(p), p["source"]))
+    index = json.dumps(pages, ensure_ascii=False, indent=1, sort_keys=True) + "\n"
+    writer.write(os.path.join(dest_dir, PAGE_INDEX), index.encode("utf-8"))
+    print(f"sitemap: {len(pages)} pages, {len(feed[:FEED_LIMIT])} in the feed, {writer.written} files written")
+    return writer.written
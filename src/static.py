@@ -0,0 +1,165 @@
+import json
+import os
+import shutil
+from collections import Counter
+
+from manifest import ASSET_MANIFEST, Manifest, hash_file
+from writer import OutputWriter, remove_output
+
+try:
+    import fcntl
+except ImportError:  # no reflinks off unix, hardlink or copy instead
+    fcntl = None
+
+# linux ioctl that makes dst share src's extents (btrfs, xfs, ...)
+FICLONE = 0x40049409
+
+FINGERPRINT_LENGTH = 10
+# files that are looked up by name and so must keep it
+FIXED_NAMES = {"CNAME", "robots.txt", "favicon.ico"}
+
+
+def sync_static(src, dst, clean=False, checksum=False, link=True, fingerprint=False):
+    if not os.path.exists(src):
+        raise Exception("source directory doesnt exist")
+    if clean and os.path.exists(dst):
+        shutil.rmtree(dst)
+    os.makedirs(dst, exist_ok=True)
+
+    manifest = Manifest.load(dst)
+    counts = Counter()
+    seen = set()
+    for dirpath, dirnames, filenames in os.walk(src):
+        dirnames.sort()
+        for f in sorted(filenames):
+            src_path = os.path.join(dirpath, f)
+            rel = os.path.relpath(src_path, src)
+            seen.add(rel)
+            counts[sync_file(src_path, os.path.join(dst, rel), manifest, rel, checksum, link, fingerprint)] += 1
+
+    # only prune what we put there ourselves, dst also holds the rendered pages
+    for rel in [rel for rel in manifest.static if rel not in seen]:
+        entry = manifest.static.pop(rel)
+        if entry.get("fingerprint"):
+            remove_output(fingerprint_name(os.path.join(dst, rel), entry["fingerprint"]), dst)
+        if remove_output(os.path.join(dst, rel), dst):
+            counts["removed"] += 1
+
+    assets_path = os.path.join(dst, ASSET_MANIFEST)
+    if fingerprint:
+        write_asset_manifest(assets_path, manifest.static)
+    elif os.path.exists(assets_path):
+        os.remove(assets_path)
+    manifest.save()
+    print(
+        f"static: {counts['copied']} copied, {counts['linked']} linked, {counts['cloned']} cloned, "
+        f"{counts['unchanged']} unchanged, {counts['removed']} removed"
+    )
+    return counts
+
+def sync_file(src_path, dst_path, manifest, rel, checksum=False, link=True, fingerprint=False):
+    st = os.stat(src_path)
+    entry = manifest.static.get(rel)
+    fingerprint = fingerprint and os.path.basename(rel) not in FIXED_NAMES and not rel.startswith(".")
+    src_hash = None
+    if checksum or fingerprint:
+        if entry and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns and entry["hash"]:
+            src_hash = entry["hash"]
+        else:
+            src_hash = hash_file(src_path)
+
+    old_fingerprint = entry.get("fingerprint") if entry else None
+    new_fingerprint = src_hash[:FINGERPRINT_LENGTH] if fingerprint else None
+    # the file keeps its own name too: pages point at the fingerprinted one,
+    # but a url() in a stylesheet or a path in a script only knows this one
+    # the copy is only re-read with --checksum; a fingerprint needs the source hash alone
+    if unchanged(src_path, st, dst_path, src_hash if checksum else None):
+        how = "unchanged"
+    else:
+        os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+        how = transfer(src_path, dst_path, link)
+    if new_fingerprint:
+        hashed_path = fingerprint_name(dst_path, new_fingerprint)
+        # the name is the content, so a file already there with it is this one
+        if not (os.path.exists(hashed_path) and os.path.getsize(hashed_path) == st.st_size):
+            hashed_how = transfer(src_path, hashed_path, link)
+            if how == "unchanged":
+                how = hashed_how
+    old_path = fingerprint_name(dst_path, old_fingerprint)
+    if old_fingerprint and old_fingerprint != new_fingerprint and os.path.exists(old_path):
+        os.remove(old_path)
+    manifest.static[rel] = {"size": st.st_size, "mtime": st.st_mtime_ns, "hash": src_hash}
+    if new_fingerprint:
+        manifest.static[rel]["fingerprint"] = new_fingerprint
+    return how
+
+def fingerprint_name(path, fingerprint):
+    # images/a.png -> images/a.<fingerprint>.png
+    if not fingerprint:
+        return path
+    head, tail = os.path.split(path)
+    stem, ext = os.path.splitext(tail)
+    return os.path.join(head, f"{stem}.{fingerprint}{ext}")
+
+def write_asset_manifest(path, static):
+    assets = {}
+    for rel, entry in static.items():
+        if entry.get("fingerprint"):
+            url = "/" + rel.replace(os.sep, "/")
+            assets[url] = "/" + fingerprint_name(rel, entry["fingerprint"]).replace(os.sep, "/")
+    # left alone when its bytes didn't change, so --compress has nothing new to do
+    data = json.dumps(assets, indent=1, sort_keys=True).encode("utf-8")
+    OutputWriter(threads=0).write(path, data)
+
+def unchanged(src_path, st, dst_path, src_hash=None):
+    try:
+        d = os.stat(dst_path)
+    except FileNotFoundError:
+        return False
+    if (st.st_dev, st.st_ino) == (d.st_dev, d.st_ino):
+        return True
+    if st.st_size != d.st_size:
+        return False
+    if src_hash is not None:
+        return hash_file(dst_path) == src_hash
+    # every transfer keeps the mtime, so a match means we synced it last run
+    return st.st_mtime_ns == d.st_mtime_ns
+
+def transfer(src_path, dst_path, link=True):
+    # build next to the destination and rename over it, so a half-written
+    # file is never visible and an existing hardlink is replaced, not written through
+    tmp = dst_path + ".sync-tmp"
+    try:
+        if link and clone(src_path, tmp):
+            how = "cloned"
+        elif link and hardlink(src_path, tmp):
+            how = "linked"
+        else:
+            shutil.copy2(src_path, tmp)
+            how = "copied"
+        os.replace(tmp, dst_path)
+    except BaseException:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        raise
+    return how
+
+def clone(src_path, dst_path):
+    if fcntl is None:
+        return False
+    try:
+        with open(src_path, "rb") as s, open(dst_path, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+    except OSError:
+        if os.path.exists(dst_path):
+            os.remove(dst_path)
+        return False
+    shutil.copystat(src_path, dst_path)
+    return True
+
+def hardlink(src_path, dst_path):
+    try:
+        os.link(src_path, dst_path)
+    except OSError:
+        return False
+    return True
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import re
+from functools import lru_cache
+
+from htmlnode import RAW_URL_ATTR
+from minify import minify_html
+
+_SLOT = re.compile(r"\{\{ (\w+) \}\}")
+_INCLUDE = re.compile(r"\{\{ include ([^\s{}]+) \}\}")
+# templates/blog.html is used for content/blog/**, see Layouts
+TEMPLATE_DIR = "templates"
+
+
+class Template:
+    def __init__(self, text, files=()):
+        # [static, slot name, static, slot name, ..., static]
+        self.segments = _SLOT.split(text)
+        # the template's own file and every partial it includes
+        self.files = list(files)
+        self._bound = {}
+        # rewriter -> the site urls the static text links to
+        self._refs = {}
+
+    def bind(self, rewrite_url=None):
+        # the static text with its own href/src urls rewritten, worked out once
+        # per rewriter and then shared by every page that uses this template
+        if rewrite_url not in self._bound:
+            segments = list(self.segments)
+            recorder = RefRecorder(rewrite_url)
+            images = getattr(rewrite_url, "images", None)
+            for i in range(0, len(segments), 2):
+                if images:
+                    # while the src urls are still the ones it knows them by
+                    segments[i] = images.annotate(segments[i], rewrite_url)
+                segments[i] = RAW_URL_ATTR.sub(lambda m: m.group(1) + recorder(m.group(2)), segments[i])
+            if getattr(rewrite_url, "minify", False):
+                # after the rewrite, which only knows quoted urls
+                text = "".join(s if i % 2 == 0 else f"{{{{ {s} }}}}" for i, s in enumerate(segments))
+                segments = _SLOT.split(minify_html(text))
+            self._bound[rewrite_url] = segments
+            self._refs[rewrite_url] = recorder.refs
+        return self._bound[rewrite_url]
+
+    def render(self, write, slots, rewrite_url=None):
+        # a RefRecorder gets the template's urls from its binding, not per page
+        if isinstance(rewrite_url, RefRecorder):
+            segments = self.bind(rewrite_url.rewrite_url)
+            rewrite_url.refs.update(self._refs[rewrite_url.rewrite_url])
+        else:
+            segments = self.bind(rewrite_url)
+        for i, segment in enumerate(segments):
+            if i % 2 == 0:
+                write(segment)
+            elif segment not in slots:
+                write(f"{{{{ {segment} }}}}")
+            elif isinstance(slots[segment], str):
+                write(slots[segment])
+            else:
+                slots[segment](write)
+
+
+def read_template(path, including=()):
+    # the text with each {{ include name }} replaced by that file, named relative
+    # to the file that includes it. returns (text, files it was read from)
+    if path in including:
+        raise ValueError(f"{path} includes itself: {' -> '.join(including + (path,))}")
+    with open(path) as template_file:
+        text = template_file.read()
+    files = [path]
+
+    def include(m):
+        partial_path = os.path.normpath(os.path.join(os.path.dirname(path), m.group(1)))
+        partial, partial_files = read_template(partial_path, including + (path,))
+        files.extend(f for f in partial_files if f not in files)
+        return partial
+
+    return _INCLUDE.sub(include, text), files
+
+
+# path -> (build it was last checked in, stats of its files, Template)
+_templates = {}
+_build = 0
+
+
+def new_build():
+    # templates are checked for edits once per build rather than once per page;
+    # a long-lived process calls this before each build
+    global _build
+    _build += 1
+
+
+def load_template(template_path):
+    cached = _templates.get(template_path)
+    if cached is not None and cached[0] == _build:
+        return cached[2]
+    if cached is not None and cached[1] == file_stats(cached[2].files):
+        _templates[template_path] = (_build, cached[1], cached[2])
+        return cached[2]
+    text, files = read_template(template_path)
+    template = Template(text, files)
+    _templates[template_path] = (_build, file_stats(files), template)
+    return template
+
+
+def file_stats(files):
+    stats = []
+    for f in files:
+        try:
+            st = os.stat(f)
+        except FileNotFoundError:
+            return None
+        stats.append((st.st_mtime_ns, st.st_size))
+    return stats
+
+
+class Layouts:
+    # which template each page is rendered with: the one named by its front
+    # matter template field (in templates/), else the nearest section template
+    # (templates/blog/tom.html, then templates/blog.html for content/blog/tom/*.md),
+    # else the default template
+    def __init__(self, template_path, content_dir):
+        self.default = template_path
+        self.dir = os.path.join(os.path.dirname(template_path), TEMPLATE_DIR)
+        self.content = content_dir
+        self._sections = {}
+
+    def select(self, from_path, fields=None):
+        name = (fields or {}).get("template")
+        if name:
+            path = os.path.join(self.dir, name)
+            if not os.path.isfile(path):
+                raise ValueError(f"{from_path}: no template {path}")
+            return path
+        return self.section(os.path.dirname(os.path.relpath(from_path, self.content)))
+
+    def section(self, rel_dir):
+        if rel_dir not in self._sections:
+            path = os.path.join(self.dir, rel_dir + ".html")
+            if rel_dir and os.path.isfile(path):
+                self._sections[rel_dir] = path
+            elif rel_dir:
+                self._sections[rel_dir] = self.section(os.path.dirname(rel_dir))
+            else:
+                self._sections[rel_dir] = self.default
+        return self._sections[rel_dir]
+
+
+class RefRecorder:
+    # wraps a url rewriter (or None) for one page and keeps the site urls it is
+    # handed, before any basepath or fingerprint: those are the page's refs for
+    # the dependency graph, picked up as the html is written
+    __slots__ = ("rewrite_url", "refs", "cache_key", "minify", "images")
+
+    def __init__(self, rewrite_url=None):
+        self.rewrite_url = rewrite_url
+        self.refs = set()
+        # html written through it is the html of the rewriter it wraps
+        self.cache_key = "/" if rewrite_url is None else getattr(rewrite_url, "cache_key", rewrite_url)
+        self.minify = getattr(rewrite_url, "minify", False)
+        self.images = getattr(rewrite_url, "images", None)
+
+    def __call__(self, url):
+        if url.startswith("/") and not url.startswith("//"):
+            self.refs.add(url.split("#", 1)[0].split("?", 1)[0])
+        return url if self.rewrite_url is None else self.rewrite_url(url)
+
+
+@lru_cache(maxsize=None)
+def basepath_rewriter(basepath, assets=(), minify=False, images=None):
+    # assets: sorted (url, fingerprinted url) pairs, swapped in before the basepath.
+    # minify and images (an images.ImageSet) ride along with the rewriter since
+    # everything that serializes html is already handed one, see minify.py
+    if basepath == "/" and not assets and not minify and not images:
+        return None
+    fingerprinted = dict(assets)
+
+    def rewrite_url(url):
+        if not url.startswith("/") or url.startswith("//"):
+            return url
+        if fingerprinted:
+            path, sep, rest = url.partition("?") if "?" in url else url.partition("#")
+            if path in fingerprinted:
+                url = fingerprinted[path] + sep + rest
+        return basepath + url[1:]
+
+    # lets html rendered with this rewriter be cached between builds
+    rewrite_url.cache_key = basepath
+    if assets:
+        rewrite_url.cache_key += "#" + hashlib.sha1(repr(assets).encode()).hexdigest()[:12]
+    rewrite_url.minify = minify
+    if minify:
+        rewrite_url.cache_key += "+min"
+    rewrite_url.images = images
+    if images:
+        rewrite_url.cache_key += "@" + images.version
+    return rewrite_url
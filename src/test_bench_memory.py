@@ -0,0 +1,21 @@
+import unittest
+
+import blocks
+import textnode
+from bench_memory import compare
+
+
+class TestBenchMemory(unittest.TestCase):
+    def test_smoke(self):
+        parent, leaf = blocks.ParentNode, blocks.LeafNode
+        count, old, slotted = compare("small", 3)
+        self.assertEqual(count, 3)
+        # the slotted classes hold less than the dict-backed ones they replaced
+        self.assertLess(slotted[0], old[0])
+        self.assertIs(blocks.ParentNode, parent)
+        self.assertIs(blocks.LeafNode, leaf)
+        self.assertIs(textnode.LeafNode, leaf)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+import blockcache
+from blockcache import BlockCache, FragmentNode
+from blocks import BlockType, markdown_to_html_node
+from template import basepath_rewriter
+
+MD = "# title\n\nrepeated [link](/x)\n\nrepeated [link](/x)\n\n- a\n- b"
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_same_html_as_uncached(self):
+        cache = BlockCache()
+        for rewrite in (None, basepath_rewriter("/ssg/")):
+            self.assertEqual(
+                markdown_to_html_node(MD, cache).to_html(rewrite),
+                markdown_to_html_node(MD).to_html(rewrite),
+            )
+
+    def test_hits_and_misses(self):
+        cache = BlockCache()
+        markdown_to_html_node(MD, cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+        markdown_to_html_node(MD, cache)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+
+    def test_renders_once_per_rewriter(self):
+        built = []
+        cache = BlockCache()
+        fragment = cache.get("x", BlockType.PARAGRAPH, lambda: built.append(1) or markdown_to_html_node("x"))
+        fragment.to_html()
+        fragment.to_html()
+        self.assertEqual(len(built), 1)
+        self.assertIsInstance(fragment, FragmentNode)
+
+    def test_lru_eviction(self):
+        cache = BlockCache(maxsize=2)
+        markdown_to_html_node("a\n\nb\n\nc\n\na", cache)
+        self.assertEqual(cache.misses, 4)
+        self.assertEqual(len(cache.entries), 2)
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as d:
+            cache = BlockCache(cache_dir=d)
+            html = markdown_to_html_node(MD, cache).to_html()
+            cache.save()
+            self.assertTrue(os.path.exists(os.path.join(d, "blocks.json")))
+
+            warm = BlockCache(cache_dir=d)
+            node = markdown_to_html_node(MD, warm)
+            self.assertEqual(node.to_html(), html)
+            self.assertEqual((warm.disk_hits, warm.misses), (3, 0))
+            # nothing stored for this basepath yet, so it is rendered fresh
+            self.assertEqual(node.to_html(basepath_rewriter("/ssg/")), markdown_to_html_node(MD).to_html(basepath_rewriter("/ssg/")))
+
+    def test_disk_tier_dropped_when_renderer_changes(self):
+        with tempfile.TemporaryDirectory() as d:
+            cache = BlockCache(cache_dir=d)
+            markdown_to_html_node(MD, cache).to_html()
+            cache.save()
+            version = blockcache.renderer_version
+            blockcache.renderer_version = lambda: "edited"
+            try:
+                stale = BlockCache(cache_dir=d)
+            finally:
+                blockcache.renderer_version = version
+            markdown_to_html_node(MD, stale).to_html()
+            self.assertEqual((stale.disk_hits, stale.misses), (0, 3))
+
+    def test_drain_and_merge(self):
+        with tempfile.TemporaryDirectory() as d:
+            worker = BlockCache(cache_dir=d)
+            markdown_to_html_node(MD, worker).to_html()
+            parent = BlockCache(cache_dir=d)
+            parent.merge(worker.drain())
+            self.assertEqual((parent.hits, parent.misses), (1, 3))
+            self.assertEqual(len(parent.disk), 3)
+            self.assertEqual((worker.hits, worker.misses), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,6 @@
+import io
 import unittest
-from blocks import markdown_to_blocks, block_to_block_type, BlockType, markdown_to_html_node
+from blocks import markdown_to_blocks, block_to_block_type, classify_block, BlockType, markdown_to_html_node, iter_blocks, write_markdown_html
 
 class TestMarkdownToBlocks(unittest.TestCase):
     def test_markdown_to_blocks1(self):
@@ -69,6 +70,28 @@ this is yet another paragraph
             ],
         )
 
+    def test_markdown_to_blocks_whitespace_only(self):
+        blocks = markdown_to_blocks("a\n\n \n\nb\n\n\n")
+        self.assertEqual(blocks, ["a", "b"])
+
+class TestIterBlocks(unittest.TestCase):
+    def test_iter_blocks_matches_markdown_to_blocks(self):
+        samples = [
+            "",
+            "one",
+            "\n\n\none\n\n\n\ntwo\nstill two\n\n",
+            "  indented\n   \nkeeps whitespace lines\n\n\n\n\nlast  ",
+            "a\n\n \n\nb\n\n\n",
+        ]
+        for md in samples:
+            self.assertEqual(list(iter_blocks(io.StringIO(md))), markdown_to_blocks(md), md)
+
+    def test_write_markdown_html(self):
+        md = "# title\n\nsome **bold**\ntext\n\n- a\n- b\n\n```\ncode\n```\n"
+        parts = []
+        write_markdown_html(io.StringIO(md), parts.append)
+        self.assertEqual("".join(parts), markdown_to_html_node(md).to_html())
+
 class TestBlockToBlockType(unittest.TestCase):
     def test_block_to_block_type_heading1(self):
         bt = block_to_block_type("# this is a heading!")
@@ -118,6 +141,17 @@ class TestBlockToBlockType(unittest.TestCase):
         bt = block_to_block_type("1. line one\n1. line2\n2. line3")
         self.assertEqual(bt, BlockType.PARAGRAPH)
 
+    def test_block_to_block_type_code_too_short(self):
+        self.assertEqual(block_to_block_type("`````"), BlockType.PARAGRAPH)
+
+    def test_classify_block_passes_lines(self):
+        bt, lines = classify_block("- a\n- b")
+        self.assertEqual(bt, BlockType.UL)
+        self.assertEqual(lines, ["- a", "- b"])
+
+    def test_classify_block_no_lines_for_heading(self):
+        self.assertEqual(classify_block("## hi"), (BlockType.HEADING, None))
+
         
 
 class TestMarkdownToHtmlNode(unittest.TestCase):
@@ -286,6 +320,15 @@ this is paragraph text
             "<div><blockquote>This is a blockquote block</blockquote><p>this is paragraph text</p></div>",
         )
 
+    def test_raw_html_urls_rewritten(self):
+        md = 'see <a href="/x">x</a> and `<a href="/y">`\n\n```\n<a href="/z">\n```'
+        html = markdown_to_html_node(md).to_html(lambda url: "/ssg" + url)
+        self.assertEqual(
+            html,
+            '<div><p>see <a href="/ssg/x">x</a> and <code><a href="/y"></code></p>'
+            '<pre><code><a href="/z">\n</code></pre></div>',
+        )
+
     def test_code(self):
         md = """
 ```
@@ -0,0 +1,65 @@
+import gzip
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from compress import compress_output
+from fixtures import write
+
+PAGE = "<p>" + "some words " * 200 + "</p>"
+
+
+class TestCompressOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dst = self.tmp.name
+        os.makedirs(os.path.join(self.dst, "blog"))
+        write(os.path.join(self.dst, "index.html"), PAGE)
+        write(os.path.join(self.dst, "blog", "post.html"), PAGE)
+        write(os.path.join(self.dst, "tiny.css"), "body {}")
+        write(os.path.join(self.dst, "a.png"), "png" * 1000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def compress(self, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            return compress_output(self.dst, **kwargs)
+
+    def test_writes_gzip_sidecars(self):
+        counts = self.compress()
+        self.assertEqual(counts["compressed"], 2)
+        with gzip.open(os.path.join(self.dst, "index.html.gz"), "rt") as f:
+            self.assertEqual(f.read(), PAGE)
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "tiny.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "a.png.gz")))
+
+    def test_only_changed_outputs(self):
+        self.compress()
+        counts = self.compress()
+        self.assertEqual((counts["compressed"], counts["unchanged"]), (0, 2))
+        write(os.path.join(self.dst, "index.html"), PAGE + "<p>more</p>")
+        counts = self.compress()
+        self.assertEqual((counts["compressed"], counts["unchanged"]), (1, 1))
+        with gzip.open(os.path.join(self.dst, "index.html.gz"), "rt") as f:
+            self.assertIn("more", f.read())
+
+    def test_level_change_recompresses(self):
+        self.compress()
+        self.assertEqual(self.compress(gzip_level=1)["compressed"], 2)
+
+    def test_removes_stale_sidecars_only(self):
+        write(os.path.join(self.dst, "archive.html.gz"), "from static/")
+        self.compress()
+        os.remove(os.path.join(self.dst, "blog", "post.html"))
+        counts = self.compress(min_size=10**6)
+        self.assertEqual(counts["removed"], 2)
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "index.html.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "blog", "post.html.gz")))
+        self.assertTrue(os.path.exists(os.path.join(self.dst, "archive.html.gz")))
+
+
+if __name__ == "__main__":
+    unittest.main()
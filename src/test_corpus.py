@@ -0,0 +1,34 @@
+import os
+import tempfile
+import unittest
+
+from blocks import markdown_to_html_node
+from corpus import SHAPES, generate_corpus
+from genpage import find_pages
+
+
+class TestCorpus(unittest.TestCase):
+    def test_every_shape_renders(self):
+        for shape in SHAPES:
+            with tempfile.TemporaryDirectory() as root:
+                content = generate_corpus(root, shape, pages=3, blocks=30)
+                pages = find_pages(content, os.path.join(root, "docs"))
+                self.assertEqual(len(pages), 3)
+                for from_path, _ in pages:
+                    with open(from_path) as f:
+                        markdown_to_html_node(f.read()).to_html()
+
+    def test_deterministic(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            pa = find_pages(generate_corpus(a, "nested", pages=5, seed=1), "out")
+            pb = find_pages(generate_corpus(b, "nested", pages=5, seed=1), "out")
+            self.assertEqual(
+                [os.path.relpath(p, a) for p, _ in pa], [os.path.relpath(p, b) for p, _ in pb]
+            )
+            for (x, _), (y, _) in zip(pa, pb):
+                with open(x) as fx, open(y) as fy:
+                    self.assertEqual(fx.read(), fy.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from blockcache import BlockCache
+from blocks import markdown_to_html_node
+from depgraph import DependencyGraph, built_with_images
+from fixtures import SiteTestCase, write
+import genpage
+from genpage import generate_pages_incremental
+from manifest import Manifest
+from template import RefRecorder, Template, basepath_rewriter
+
+
+class TestRefs(unittest.TestCase):
+    def refs(self, markdown, rewrite_url=None, cache=None):
+        recorder = RefRecorder(rewrite_url)
+        template = Template('<link href="/index.css?v=2"><a href="https://x.com/">x</a>{{ Content }}')
+        node = markdown_to_html_node(markdown, cache)
+        template.render(lambda chunk: None, {"Content": lambda write: node.render(write, recorder)}, recorder)
+        return recorder.refs
+
+    def test_site_urls_only(self):
+        refs = self.refs("[b](/blog/) [x](https://x.com/) ![a](//cdn/a.png) [r](rel)")
+        self.assertEqual(refs, {"/blog/", "/index.css"})
+
+    def test_basepath_and_fragment_stripped(self):
+        self.assertEqual(self.refs("[t](/blog/tom#top)", basepath_rewriter("/ssg/")), {"/blog/tom", "/index.css"})
+
+    def test_cached_blocks_replay_their_refs(self):
+        with tempfile.TemporaryDirectory() as d:
+            cache = BlockCache(cache_dir=d)
+            self.refs("[t](/blog/tom)", cache=cache)
+            cache.save()
+            warm = BlockCache(cache_dir=d)
+            self.assertEqual(self.refs("[t](/blog/tom)", cache=warm), {"/blog/tom", "/index.css"})
+            self.assertEqual(warm.disk_hits, 1)
+
+
+class TestDependencyGraph(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.content, "blog"))
+        os.makedirs(os.path.join(self.static, "images"))
+        write(os.path.join(self.content, "index.md"), "# home\n\n[post](/blog/post)")
+        write(os.path.join(self.content, "blog", "post.md"), "# post\n\n![pic](/images/a.png)")
+        write(os.path.join(self.static, "images", "a.png"), "png")
+        write(os.path.join(self.static, "images", "b.png"), "png")
+        write(os.path.join(self.static, "site.css"), "css")
+        write(self.template, '<link href="/site.css"><title>{{ Title }}</title>{{ Content }}')
+
+    def graph(self, basepath="/"):
+        with redirect_stdout(io.StringIO()):
+            generate_pages_incremental(self.content, self.template, self.public, basepath)
+        return DependencyGraph(Manifest.load(self.public), self.static, self.template, self.public)
+
+    def test_dependencies(self):
+        graph = self.graph("/ssg/")
+        index = os.path.normpath(os.path.join(self.content, "index.md"))
+        post = os.path.normpath(os.path.join(self.content, "blog", "post.md"))
+        self.assertEqual(
+            graph.dependencies(post),
+            sorted([self.template, os.path.join(self.static, "images", "a.png"), os.path.join(self.static, "site.css")]),
+        )
+        self.assertIn(post, graph.dependencies(index))
+        self.assertEqual(graph.dependents(os.path.join(self.static, "images", "a.png")), [post])
+        self.assertEqual(graph.dependents(self.template), [post, index])
+
+    def test_unused_static(self):
+        graph = self.graph()
+        self.assertEqual(graph.unused_static(), [os.path.join(self.static, "images", "b.png")])
+
+    def test_why_rebuild(self):
+        index = os.path.join(self.content, "index.md")
+        graph = self.graph()
+        self.assertEqual(graph.why_rebuild(index), [])
+        self.assertEqual(graph.why_rebuild(index, "/ssg/"), ["basepath changed from /"])
+        self.assertEqual(graph.why_rebuild(index, minify=True), ["template changed"])
+        write(self.template, "{{ Content }}")
+        self.assertEqual(graph.why_rebuild(index), ["template changed"])
+        self.assertEqual(graph.why_rebuild(os.path.join(self.content, "new.md")), ["never built"])
+
+    def test_why_rebuild_asks_about_the_last_build(self):
+        genpage.enable_minify()
+        try:
+            graph = self.graph("/ssg/")
+        finally:
+            genpage.enable_minify(enabled=False)
+        index = os.path.join(self.content, "index.md")
+        self.assertEqual(graph.why_rebuild(index), [])
+        self.assertEqual(graph.why_rebuild(index, "/"), ["basepath changed from /ssg/"])
+        self.assertEqual(graph.why_rebuild(index, minify=False), ["template changed"])
+
+    def test_built_with_images(self):
+        images = {"/a.png": {"width": 2, "height": 1, "variants": []}}
+        self.assertTrue(built_with_images({"refs": ["/a.png"], "assets": {"/a.png": "/a.1.png 2x1 "}}, images))
+        self.assertFalse(built_with_images({"refs": ["/a.png"], "assets": {"/a.png": "/a.1.png"}}, images))
+        self.assertFalse(built_with_images({"refs": ["/b.png"]}, images))
+
+
+if __name__ == "__main__":
+    unittest.main()
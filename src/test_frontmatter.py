@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+from frontmatter import is_draft, parse_value, read_front_matter, split_front_matter
+
+YAML = """---
+title: "Tom: a post"
+date: 2024-05-01
+draft: true
+weight: 10
+tags: [a, "b c"]
+# a comment
+---
+# heading
+
+body
+"""
+
+TOML = """+++
+title = "Tom"
+template = "blog.html"
+ratio = 0.5
++++
+# heading
+"""
+
+
+class TestParse(unittest.TestCase):
+    def test_values(self):
+        self.assertEqual(parse_value(" 'x' "), "x")
+        self.assertEqual(parse_value("true"), True)
+        self.assertEqual(parse_value("-3"), -3)
+        self.assertEqual(parse_value("2.5"), 2.5)
+        self.assertEqual(parse_value("2024-05-01"), "2024-05-01")
+        self.assertEqual(parse_value("[1, two]"), [1, "two"])
+
+    def test_yaml(self):
+        fields, body = split_front_matter(YAML)
+        self.assertEqual(
+            fields,
+            {"title": "Tom: a post", "date": "2024-05-01", "draft": True, "weight": 10, "tags": ["a", "b c"]},
+        )
+        self.assertEqual(body, "# heading\n\nbody\n")
+
+    def test_toml(self):
+        fields, body = split_front_matter(TOML)
+        self.assertEqual(fields, {"title": "Tom", "template": "blog.html", "ratio": 0.5})
+        self.assertEqual(body, "# heading\n")
+
+    def test_none(self):
+        self.assertEqual(split_front_matter("# heading\n---\n"), ({}, "# heading\n---\n"))
+        self.assertEqual(split_front_matter("---x\n"), ({}, "---x\n"))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            split_front_matter("---\ntitle: x\n")
+        with self.assertRaises(ValueError):
+            split_front_matter("---\nnot a field\n---\n")
+
+
+class TestReadFrontMatter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, text):
+        path = os.path.join(self.tmp.name, "page.md")
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_matches_split(self):
+        for text in (YAML, TOML, "# plain\n"):
+            path = self.write(text)
+            fields, skip = read_front_matter(path)
+            self.assertEqual(fields, split_front_matter(text)[0])
+            self.assertEqual("".join(text.splitlines(True)[skip:]), split_front_matter(text)[1])
+
+    def test_is_draft(self):
+        self.assertTrue(is_draft(self.write(YAML)))
+        self.assertFalse(is_draft(self.write(YAML.replace("draft: true", "draft: false"))))
+        self.assertFalse(is_draft(self.write("# plain\n")))
+
+
+if __name__ == "__main__":
+    unittest.main()
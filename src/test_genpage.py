@@ -1,6 +1,11 @@
+import io
+import os
 import unittest
-from genpage import *
+from contextlib import redirect_stdout
 
+from fixtures import SiteTestCase, read, write
+import genpage
+from genpage import *
 
 class TestExtractTitle(unittest.TestCase):
     def test_extract_title_good(self):
@@ -8,7 +13,186 @@ class TestExtractTitle(unittest.TestCase):
         title = extract_title(md)
         self.assertEqual(title, "wut")
 
+    def test_extract_title_first_line_only(self):
+        self.assertEqual(extract_title("intro\n## sub\n# wut\nmore\n# later"), "wut")
+        self.assertEqual(extract_title("text\n# last"), "last")
+        # the same line a streamed page takes its title from
+        for md in ("a # b\n#no\n# c  \n", "```\n# code\n```\n\n# real", "x\n\n#  two"):
+            self.assertEqual(extract_title(md), extract_title_from_lines(md.splitlines(True)))
+
     def test_extract_titty_bad(self): 
         md = "## titty"
         with self.assertRaises(Exception):
-            print(extract_title(md))
\ No newline at end of file
+            print(extract_title(md))
+
+class TestIncremental(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.content, "blog"))
+        write(os.path.join(self.content, "index.md"), "# home")
+        write(os.path.join(self.content, "blog", "post.md"), "# post")
+        write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+
+    def build(self):
+        with redirect_stdout(io.StringIO()):
+            generate_pages_incremental(self.content, self.template, self.public)
+
+    def test_find_pages(self):
+        pages = find_pages(self.content, self.public)
+        self.assertEqual(
+            pages,
+            [
+                (os.path.join(self.content, "blog", "post.md"), os.path.join(self.public, "blog", "post.html")),
+                (os.path.join(self.content, "index.md"), os.path.join(self.public, "index.html")),
+            ],
+        )
+
+    def test_unchanged_pages_untouched(self):
+        self.build()
+        index = os.path.join(self.public, "index.html")
+        post = os.path.join(self.public, "blog", "post.html")
+        os.utime(index, ns=(0, 0))
+        write(os.path.join(self.content, "blog", "post.md"), "# post edited")
+        self.build()
+        self.assertEqual(os.stat(index).st_mtime_ns, 0)
+        self.assertIn("post edited", read(post))
+
+    def test_template_change_rebuilds(self):
+        self.build()
+        write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        self.assertTrue(read(os.path.join(self.public, "index.html")).startswith("<h1>home"))
+
+    def test_section_template_change_rebuilds_its_pages(self):
+        root = os.path.dirname(self.template)
+        os.makedirs(os.path.join(root, "templates"))
+        write(os.path.join(root, "nav.html"), "<nav>a</nav>")
+        write(os.path.join(root, "templates", "blog.html"), "{{ include ../nav.html }}<article>{{ Content }}</article>")
+        self.build()
+        index = os.path.join(self.public, "index.html")
+        post = os.path.join(self.public, "blog", "post.html")
+        self.assertEqual(read(post), "<nav>a</nav><article><div><h1>post</h1></div></article>")
+        os.utime(index, ns=(0, 0))
+        write(os.path.join(root, "nav.html"), "<nav>b</nav>")
+        self.build()
+        self.assertEqual(os.stat(index).st_mtime_ns, 0)
+        self.assertTrue(read(post).startswith("<nav>b</nav>"))
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_fingerprint_change_rebuilds_referencing_pages(self):
+        write(os.path.join(self.content, "index.md"), "# home\n\n![a](/a.png)")
+        genpage.enable_fingerprints({"/a.png": "/a.1.png"})
+        try:
+            self.build()
+            index = os.path.join(self.public, "index.html")
+            post = os.path.join(self.public, "blog", "post.html")
+            self.assertIn('src="/a.1.png"', read(index))
+            os.utime(index, ns=(0, 0))
+            os.utime(post, ns=(0, 0))
+            self.build()
+            self.assertEqual(os.stat(index).st_mtime_ns, 0)
+            genpage.enable_fingerprints({"/a.png": "/a.2.png"})
+            self.build()
+            self.assertIn('src="/a.2.png"', read(index))
+            self.assertEqual(os.stat(post).st_mtime_ns, 0)
+        finally:
+            genpage.enable_fingerprints({})
+
+    def test_sites_parse_once(self):
+        write(os.path.join(self.content, "index.md"), "# home\n\n[post](/blog/post)")
+        staging = os.path.join(self.tmp.name, "staging")
+        parsed = []
+        parse = genpage.markdown_to_html_node
+        genpage.markdown_to_html_node = lambda md, cache=None: parsed.append(md) or parse(md, cache)
+        try:
+            with redirect_stdout(io.StringIO()):
+                generate_sites_incremental(self.content, self.template, [(self.public, "/"), (staging, "/staging/")])
+        finally:
+            genpage.markdown_to_html_node = parse
+        self.assertEqual(len(parsed), 2)
+        self.assertIn('href="/blog/post"', read(os.path.join(self.public, "index.html")))
+        self.assertIn('href="/staging/blog/post"', read(os.path.join(staging, "index.html")))
+
+        write(os.path.join(self.content, "blog", "post.md"), "# post edited")
+        os.remove(os.path.join(staging, "index.html"))
+        with redirect_stdout(io.StringIO()) as out:
+            generate_sites_incremental(self.content, self.template, [(self.public, "/"), (staging, "/staging/")])
+        self.assertIn(f"{self.public}: 1 generated, 1 unchanged", out.getvalue())
+        self.assertIn(f"{staging}: 2 generated, 0 unchanged", out.getvalue())
+
+    def test_parallel_matches_serial(self):
+        for i in range(6):
+            write(os.path.join(self.content, "blog", f"p{i}.md"), f"# post {i}\n\n[home](/)")
+        serial = os.path.join(self.tmp.name, "serial")
+        pages = find_pages(self.content, self.public)
+        with redirect_stdout(io.StringIO()):
+            generate_pages(pages, self.template, "/ssg/", jobs=3)
+            generate_pages(find_pages(self.content, serial), self.template, "/ssg/")
+        for _, dest in pages:
+            self.assertEqual(read(dest), read(dest.replace(self.public, serial)))
+
+    def test_parallel_error_names_page(self):
+        bad = os.path.join(self.content, "blog", "bad.md")
+        write(bad, "# bad\n\nan _unclosed italic")
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaisesRegex(Exception, bad):
+                generate_pages(find_pages(self.content, self.public), self.template, jobs=2)
+
+    def test_streaming_matches_whole_page(self):
+        src = os.path.join(self.content, "index.md")
+        write(src, "```\n# comment\n```\n\nintro [home](/)\n\n# home\n\n![pic](/a.png)\n\n- a\n- b\n")
+        write(self.template, '<title>{{ Title }}</title><link href="/x.css">{{ Content }}<i>{{ Content }}</i>')
+        whole = os.path.join(self.public, "whole.html")
+        streamed = os.path.join(self.public, "streamed.html")
+        with redirect_stdout(io.StringIO()):
+            generate_page(src, self.template, whole, "/ssg/")
+            threshold = genpage.STREAM_THRESHOLD
+            genpage.STREAM_THRESHOLD = 0
+            try:
+                generate_page(src, self.template, streamed, "/ssg/")
+            finally:
+                genpage.STREAM_THRESHOLD = threshold
+        self.assertEqual(read(streamed), read(whole))
+        self.assertIn("<title>comment</title>", read(streamed))
+        self.assertIn('src="/ssg/a.png"', read(streamed))
+
+    def test_front_matter(self):
+        src = os.path.join(self.content, "index.md")
+        write(src, "---\ntitle: Front Title\n---\n# home\n\ntext")
+        with redirect_stdout(io.StringIO()):
+            generate_page(src, self.template, os.path.join(self.public, "whole.html"))
+            threshold = genpage.STREAM_THRESHOLD
+            genpage.STREAM_THRESHOLD = 0
+            try:
+                generate_page(src, self.template, os.path.join(self.public, "streamed.html"))
+            finally:
+                genpage.STREAM_THRESHOLD = threshold
+        whole = read(os.path.join(self.public, "whole.html"))
+        self.assertEqual(whole, "<title>Front Title</title><div><h1>home</h1><p>text</p></div>")
+        self.assertEqual(read(os.path.join(self.public, "streamed.html")), whole)
+
+    def test_drafts_skipped(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        self.build()
+        parsed = []
+        parse = genpage.markdown_to_html_node
+        genpage.markdown_to_html_node = lambda md, cache=None: parsed.append(md) or parse(md, cache)
+        try:
+            write(post, "---\ndraft: true\n---\n# post")
+            self.build()
+        finally:
+            genpage.markdown_to_html_node = parse
+        self.assertEqual(parsed, [])
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "post.html")))
+        genpage.enable_drafts()
+        try:
+            self.build()
+        finally:
+            genpage.enable_drafts(False)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "blog", "post.html")))
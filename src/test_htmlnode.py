@@ -1,3 +1,5 @@
+import io
+import sys
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -50,6 +52,53 @@ class TestHTMLNode(unittest.TestCase):
             '<div class="container"><b>Bold</b><p><i>Italic</i></p></div>',
         )
 
+    def test_parentnode_no_children(self):
+        node = ParentNode("div", [])
+        with self.assertRaises(ValueError):
+            node.to_html()
+
+    def test_htmlnode_not_implemented(self):
+        with self.assertRaises(NotImplementedError):
+            HTMLNode("p", "x").to_html()
+
+    def test_write_html(self):
+        node = ParentNode(
+            "div",
+            [LeafNode(None, "a "), ParentNode("p", [LeafNode("a", "b", {"href": "/x"})])],
+        )
+        fp = io.StringIO()
+        node.write_html(fp)
+        self.assertEqual(fp.getvalue(), node.to_html())
+        self.assertEqual(fp.getvalue(), '<div>a <p><a href="/x">b</a></p></div>')
+
+    def test_rewrite_url(self):
+        node = ParentNode(
+            "p",
+            [LeafNode("a", "home", {"href": "/", "title": "/x"}), LeafNode("img", "", {"src": "/a.png"})],
+        )
+        self.assertEqual(
+            node.to_html(lambda url: "/ssg" + url),
+            '<p><a href="/ssg/" title="/x">home</a><img src="/ssg/a.png"></img></p>',
+        )
+
+    def test_nodes_have_no_dict(self):
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("p", [LeafNode("b", "x")])):
+            self.assertFalse(hasattr(node, "__dict__"))
+        self.assertIsNone(LeafNode("b", "x").children)
+        self.assertIsNone(ParentNode("p", []).value)
+        self.assertIsInstance(LeafNode("b", "x"), HTMLNode)
+        self.assertIsInstance(ParentNode("p", []), HTMLNode)
+        self.assertIsInstance(HTMLNode("p"), HTMLNode)
+        # a leaf or parent has no slot for the field it doesn't use
+        self.assertLess(sys.getsizeof(LeafNode("b", "x")), sys.getsizeof(HTMLNode("p")))
+        self.assertLess(sys.getsizeof(ParentNode("p", [])), sys.getsizeof(HTMLNode("p")))
+
+    def test_deep_nesting(self):
+        node = LeafNode("b", "x")
+        for _ in range(200):
+            node = ParentNode("span", [node])
+        self.assertEqual(node.to_html(), "<span>" * 200 + "<b>x</b>" + "</span>" * 200)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,137 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+from contextlib import redirect_stdout
+
+import images
+from htmlnode import LeafNode
+from images import ImageSet, image_size, process_images, variant_name
+from template import Template, basepath_rewriter
+
+
+def png(width, height):
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    rows = b"".join(b"\x00" + b"\x80\x40\x20" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+class TestImageSize(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def size(self, data):
+        path = os.path.join(self.tmp.name, "img")
+        with open(path, "wb") as f:
+            f.write(data)
+        return image_size(path)
+
+    def test_png(self):
+        self.assertEqual(self.size(png(30, 20)), (30, 20))
+
+    def test_gif(self):
+        self.assertEqual(self.size(b"GIF89a" + struct.pack("<HH", 640, 480) + b"\x00" * 8), (640, 480))
+
+    def test_jpeg(self):
+        app0 = b"\xff\xe0" + struct.pack(">H", 6) + b"JFIF"
+        sof0 = b"\xff\xc0" + struct.pack(">HBHH", 11, 8, 300, 400) + b"\x00" * 4
+        self.assertEqual(self.size(b"\xff\xd8" + app0 + sof0), (400, 300))
+
+    def test_unknown(self):
+        self.assertIsNone(self.size(b"not an image"))
+
+
+class TestImageSet(unittest.TestCase):
+    IMAGES = {
+        "/images/a.png": {"width": 1000, "height": 500, "variants": [["images/a-480w.abc.png", 480]]},
+        "/images/b.png": {"width": 300, "height": 200, "variants": []},
+    }
+
+    def rewriter(self, basepath="/", assets=()):
+        return basepath_rewriter(basepath, assets, False, ImageSet(self.IMAGES))
+
+    def test_srcset_and_dimensions(self):
+        node = LeafNode("img", "", {"src": "/images/a.png", "alt": "a"})
+        html = node.to_html(self.rewriter("/ssg/", (("/images/a.png", "/images/a.9f.png"),)))
+        self.assertEqual(
+            html,
+            '<img src="/ssg/images/a.9f.png" alt="a" srcset="/ssg/images/a-480w.abc.png 480w, '
+            '/ssg/images/a.9f.png 1000w" sizes="(max-width: 1000px) 100vw, 1000px" '
+            'width="1000" height="500" loading="lazy"></img>',
+        )
+
+    def test_without_variants(self):
+        html = LeafNode("img", "", {"src": "/images/b.png", "loading": "eager"}).to_html(self.rewriter())
+        self.assertEqual(html, '<img src="/images/b.png" loading="eager" width="300" height="200"></img>')
+
+    def test_unknown_image_untouched(self):
+        for src in ("https://x.com/a.png", "/images/c.png"):
+            self.assertEqual(LeafNode("img", "", {"src": src}).to_html(self.rewriter()), f'<img src="{src}"></img>')
+
+    def test_template_img(self):
+        template = Template('<img src="/images/b.png" />{{ Content }}<img src="/images/c.png">')
+        self.assertEqual(
+            template.bind(self.rewriter("/ssg/")),
+            ['<img src="/ssg/images/b.png" width="300" height="200" loading="lazy" />', "Content",
+             '<img src="/ssg/images/c.png">'],
+        )
+
+    def test_images_in_cache_key(self):
+        self.assertNotEqual(self.rewriter().cache_key, basepath_rewriter("/", (), False, ImageSet()))
+        other = ImageSet(dict(self.IMAGES, **{"/images/c.png": {"width": 1, "height": 1, "variants": []}}))
+        self.assertNotEqual(self.rewriter().cache_key, basepath_rewriter("/", (), False, other).cache_key)
+
+
+class TestProcessImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dst = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(self.src, "images"))
+        with open(os.path.join(self.src, "images", "a.png"), "wb") as f:
+            f.write(png(600, 300))
+        with open(os.path.join(self.src, "index.css"), "w") as f:
+            f.write("body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def process(self, **kwargs):
+        with redirect_stdout(io.StringIO()) as out:
+            result = process_images(self.src, self.dst, widths=(200, 400, 800), **kwargs)
+        return result, out.getvalue()
+
+    def test_dimensions_and_cache(self):
+        result, _ = self.process()
+        self.assertEqual(list(result), ["/images/a.png"])
+        self.assertEqual((result["/images/a.png"]["width"], result["/images/a.png"]["height"]), (600, 300))
+        _, out = self.process()
+        self.assertIn("0 processed", out)
+
+    @unittest.skipIf(images.Image is None, "needs Pillow")
+    def test_variants(self):
+        cache = os.path.join(self.tmp.name, "cache")
+        result, _ = self.process(jobs=2, cache_dir=cache)
+        variants = result["/images/a.png"]["variants"]
+        self.assertEqual([w for _, w in variants], [200, 400])
+        for rel, w in variants:
+            self.assertEqual(image_size(os.path.join(self.dst, rel))[0], w)
+
+    def test_variant_name(self):
+        self.assertEqual(variant_name(os.path.join("images", "a.png"), 480, "abcdef0123456789"),
+                         os.path.join("images", "a-480w.abcdef0123.png"))
+
+
+if __name__ == "__main__":
+    unittest.main()
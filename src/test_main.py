@@ -0,0 +1,103 @@
+import io
+import os
+import subprocess
+import sys
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+from fixtures import SiteTestCase, read, write
+import genpage
+from main import BuildConfig, build, parse_args
+
+
+class TestBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        write(os.path.join(self.content, "index.md"), "# home\n\n[post](/post.html)")
+        write(os.path.join(self.static, "style.css"), "body {}")
+        write(self.template, '<link href="/style.css">\n<title>{{ Title }}</title>\n{{ Content }}')
+
+    def tearDown(self):
+        super().tearDown()
+        genpage.BLOCK_CACHE = None
+        genpage.enable_minify(enabled=False)
+
+    def config(self, **kwargs):
+        return BuildConfig(
+            content=self.content, static=self.static, template=self.template, public=self.public, **kwargs
+        )
+
+    def build(self, config):
+        with redirect_stdout(io.StringIO()) as out:
+            build(config)
+        return out.getvalue()
+
+    def read(self, name):
+        return read(os.path.join(self.public, name))
+
+    def test_build(self):
+        self.build(self.config(basepath="/ssg/"))
+        self.assertIn('<a href="/ssg/post.html">post</a>', self.read("index.html"))
+        self.assertEqual(self.read("style.css"), "body {}")
+
+    def test_second_build_writes_nothing(self):
+        self.build(self.config())
+        out = self.build(self.config())
+        self.assertIn("0 copied, 0 linked, 0 cloned, 1 unchanged", out)
+        self.assertIn("0 generated, 1 unchanged", out)
+        out = self.build(self.config(clean=True))
+        self.assertIn("1 generated", out)
+
+    def test_repeated_builds_keep_the_block_cache(self):
+        self.build(self.config(block_cache=64))
+        cache = genpage.BLOCK_CACHE
+        out = self.build(self.config(block_cache=64))
+        self.assertIs(genpage.BLOCK_CACHE, cache)
+        self.assertIn("0 generated, 1 unchanged", out)
+        self.build(self.config())
+        self.assertIsNone(genpage.BLOCK_CACHE)
+
+    def test_settings_do_not_leak_into_the_next_build(self):
+        self.build(self.config(minify=True))
+        self.assertNotIn("\n", self.read("index.html"))
+        self.build(self.config())
+        self.assertIn("\n", self.read("index.html"))
+        self.assertFalse(genpage.MINIFY)
+
+
+class TestParseArgs(unittest.TestCase):
+    def test_defaults(self):
+        config = parse_args(["/ssg/"])
+        self.assertEqual(config.sites, [("./docs", "/ssg/")])
+        self.assertTrue(config.link)
+        self.assertFalse(config.minify)
+
+    def test_targets(self):
+        config = parse_args(["--target", "/a/=out/a", "--target", "/b/=out/b", "--minify-report"])
+        self.assertEqual(config.sites, [("out/a", "/a/"), ("out/b", "/b/")])
+        self.assertTrue(config.minify)
+
+    def test_basepath_and_targets_conflict(self):
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(["/ssg/", "--target", "/a/=out/a"])
+
+    def test_targets_need_their_own_dirs(self):
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(["--target", "/a/=out", "--target", "/b/=./out/"])
+        with self.assertRaises(ValueError):
+            BuildConfig(sites=[("out", "/a/"), ("out/", "/b/")])
+
+    def test_import_has_no_side_effects(self):
+        code = "import sys, main; print(sorted(m for m in ('genpage', 'argparse', 'blocks') if m in sys.modules))"
+        out = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        self.assertEqual(out, "[]\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+
+from manifest import Manifest, hash_file
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        self.src = os.path.join(self.dir, "page.md")
+        with open(self.src, "w") as f:
+            f.write("# page")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_load_missing(self):
+        m = Manifest.load(self.dir)
+        self.assertEqual(m.pages, {})
+
+    def test_roundtrip(self):
+        m = Manifest.load(self.dir)
+        h, st = m.source_hash(self.src)
+        m.record(self.src, "out.html", st, h, "t", "/")
+        m.save()
+        m2 = Manifest.load(self.dir)
+        self.assertEqual(m2.pages, m.pages)
+
+    def test_load_garbage(self):
+        with open(os.path.join(self.dir, ".manifest.json"), "w") as f:
+            f.write("not json")
+        self.assertEqual(Manifest.load(self.dir).pages, {})
+
+    def test_dirty(self):
+        dest = os.path.join(self.dir, "page.html")
+        with open(dest, "w") as f:
+            f.write("")
+        m = Manifest.load(self.dir)
+        h, st = m.source_hash(self.src)
+        self.assertTrue(m.is_dirty(self.src, dest, h, "t", "/"))
+        m.record(self.src, dest, st, h, "t", "/")
+        self.assertFalse(m.is_dirty(self.src, dest, h, "t", "/"))
+        self.assertTrue(m.is_dirty(self.src, dest, h, "t2", "/"))
+        self.assertTrue(m.is_dirty(self.src, dest, h, "t", "/ssg/"))
+        os.remove(dest)
+        self.assertTrue(m.is_dirty(self.src, dest, h, "t", "/"))
+
+    def test_dirty_reasons(self):
+        m = Manifest.load(self.dir)
+        h, st = m.source_hash(self.src)
+        self.assertEqual(m.dirty_reasons(self.src, "out.html", h, "t", "/"), ["never built"])
+        m.record(self.src, "out.html", st, h, "t", "/", ["/a.png"])
+        self.assertEqual(
+            m.dirty_reasons(self.src, "out.html", "h2", "t2", "/"),
+            ["source changed", "template changed", "output missing"],
+        )
+
+    def test_record_keeps_refs(self):
+        m = Manifest.load(self.dir)
+        h, st = m.source_hash(self.src)
+        m.record(self.src, "out.html", st, h, "t", "/", ["/a.png"])
+        m.record(self.src, "out.html", st, h, "t", "/")
+        self.assertEqual(m.pages[self.src]["refs"], ["/a.png"])
+
+    def test_record_keeps_meta(self):
+        m = Manifest.load(self.dir)
+        h, st = m.source_hash(self.src)
+        m.record(self.src, "out.html", st, h, "t", "/", meta={"title": "page", "words": 1})
+        m.record(self.src, "out.html", st, h, "t", "/", ["/a.png"])
+        self.assertEqual(m.pages[self.src]["meta"], {"title": "page", "words": 1})
+
+    def test_source_hash_changes(self):
+        m = Manifest.load(self.dir)
+        h, st = m.source_hash(self.src)
+        self.assertEqual(h, hash_file(self.src))
+        m.record(self.src, "out.html", st, h, "t", "/")
+        with open(self.src, "w") as f:
+            f.write("# other page")
+        h2, _ = m.source_hash(self.src)
+        self.assertNotEqual(h, h2)
+
+    def test_stale(self):
+        m = Manifest.load(self.dir)
+        h, st = m.source_hash(self.src)
+        m.record(self.src, "out.html", st, h, "t", "/")
+        self.assertEqual(m.stale({self.src}), [])
+        self.assertEqual(m.stale(set()), [self.src])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from htmlnode import LeafNode, ParentNode
+from minify import attr, minify_html, minify_tag
+from template import Template, basepath_rewriter
+
+
+class TestMinifyHtml(unittest.TestCase):
+    def test_template(self):
+        html = minify_html(
+            '<!doctype html>\n<html>\n  <head>\n    <meta charset="utf-8" />\n'
+            "    <title>{{ Title }}</title>\n  </head>\n  <!-- note -->\n"
+            "  <body>\n    <article>{{ Content }}</article>\n  </body>\n</html>\n"
+        )
+        self.assertEqual(
+            html,
+            "<!doctype html><html><head><meta charset=utf-8><title>{{ Title }}</title></head>"
+            "<body><article>{{ Content }}</article></body></html>",
+        )
+
+    def test_inline_whitespace_collapsed_not_dropped(self):
+        self.assertEqual(minify_html("<p><b>a</b>   \n <i>b</i></p>"), "<p><b>a</b> <i>b</i></p>")
+
+    def test_pre_and_script_kept(self):
+        html = '<pre class="x">  a\n    b</pre>\n<script> if (a<b) { x = "  " } </script>'
+        self.assertEqual(minify_html(html), '<pre class=x>  a\n    b</pre><script> if (a<b) { x = "  " } </script>')
+
+    def test_quotes_kept_where_needed(self):
+        self.assertEqual(minify_tag('<a href="/x/" title="a b" data-x="">'), '<a href=/x/ title="a b" data-x="">')
+        self.assertEqual(minify_tag('<path d="M0"/>'), '<path d="M0"/>')
+        self.assertEqual(minify_tag('<meta content="{{ Title }}">'), '<meta content="{{ Title }}">')
+
+    def test_attr(self):
+        self.assertEqual(attr("href", "/a", True), " href=/a")
+        self.assertEqual(attr("alt", "a b", True), ' alt="a b"')
+        self.assertEqual(attr("href", "/a"), ' href="/a"')
+
+
+class TestMinifySerialization(unittest.TestCase):
+    def test_nodes(self):
+        node = ParentNode("p", [LeafNode("a", "x", {"href": "/b"}), LeafNode("img", "", {"src": "/c.png", "alt": "a c"})])
+        self.assertEqual(
+            node.to_html(basepath_rewriter("/", (), True)),
+            '<p><a href=/b>x</a><img src=/c.png alt="a c"></p>',
+        )
+        self.assertEqual(node.to_html(), '<p><a href="/b">x</a><img src="/c.png" alt="a c"></img></p>')
+
+    def test_template_bound_minified_after_rewrite(self):
+        t = Template('<html>\n  <link href="/index.css" />\n  <title>{{ Title }}</title>\n</html>\n')
+        rewrite = basepath_rewriter("/ssg/", (), True)
+        self.assertEqual(t.bind(rewrite), ["<html><link href=/ssg/index.css><title>", "Title", "</title></html>"])
+        self.assertNotEqual(rewrite.cache_key, basepath_rewriter("/ssg/").cache_key)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+
+from fixtures import SiteTestCase, write
+import genpage
+from blockcache import BlockCache
+from blocks import markdown_to_html_node
+from search import PageTerms, SearchIndex, page_url, shard_name, tokenize
+
+MARKDOWN = "# Hello & World\n\nsome text **bold** here\n\n## Sub _part_\n\nmore words"
+
+
+class TestPageTerms(unittest.TestCase):
+    def test_sections(self):
+        terms = PageTerms()
+        terms.feed_node(markdown_to_html_node(MARKDOWN))
+        entry = terms.entry("Hello")
+        self.assertEqual(entry["headings"], ["", "Hello & World", "Sub part"])
+        self.assertEqual(entry["terms"]["bold"], [1])
+        self.assertEqual(entry["terms"]["part"], [2])
+        self.assertEqual(entry["terms"]["words"], [2])
+
+    def test_html_matches_nodes(self):
+        # streamed pages are fed html one tag or text at a time
+        from_nodes = PageTerms()
+        from_nodes.feed_node(markdown_to_html_node(MARKDOWN))
+        from_html = PageTerms()
+        markdown_to_html_node(MARKDOWN).render(from_html.feed_html)
+        self.assertEqual(from_html.entry("t"), from_nodes.entry("t"))
+
+    def test_cached_blocks(self):
+        cache = BlockCache(16)
+        for _ in range(2):
+            node = markdown_to_html_node(MARKDOWN, cache)
+            node.to_html()
+            terms = PageTerms()
+            terms.feed_node(node)
+            self.assertEqual(terms.entry("t")["headings"], ["", "Hello & World", "Sub part"])
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("A cat's Café, x2"), ["cat", "café", "x2"])
+        self.assertEqual(shard_name("café"), "ca")
+        self.assertEqual(shard_name("éa"), "_a")
+
+    def test_page_url(self):
+        self.assertEqual(page_url("docs/index.html", "docs", "/ssg/"), "/ssg/")
+        self.assertEqual(page_url("docs/blog/index.html", "docs"), "/blog/")
+        self.assertEqual(page_url("docs/blog/post.html", "docs"), "/blog/post.html")
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dst = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def entry(self, title, text):
+        terms = PageTerms()
+        terms.text(text)
+        return terms.entry(title)
+
+    def shard(self, name):
+        with gzip.open(os.path.join(self.dst, "search", f"{name}.json.gz")) as f:
+            return json.load(f)
+
+    def test_write_and_update(self):
+        index = SearchIndex.load(self.dst)
+        index.update("a.md", "/a.html", self.entry("A", "apple banana"))
+        index.update("b.md", "/b.html", self.entry("B", "banana cherry"))
+        self.assertEqual(index.write(), (3, 0))
+        index.save()
+        self.assertEqual(self.shard("ba"), {"banana": [[0, 0], [1, 0]]})
+
+        index = SearchIndex.load(self.dst)
+        index.update("b.md", "/b.html", self.entry("B", "banana date"))
+        written, unchanged = index.write()
+        # ba is rewritten with the same bytes, ap is never looked at
+        self.assertEqual((written, unchanged), (1, 2))
+        self.assertFalse(os.path.exists(os.path.join(self.dst, "search", "ch.json.gz")))
+        self.assertEqual(self.shard("da"), {"date": [[1, 0]]})
+
+    def test_ids_are_stable(self):
+        index = SearchIndex.load(self.dst)
+        index.update("a.md", "/a.html", self.entry("A", "apple"))
+        index.update("b.md", "/b.html", self.entry("B", "banana"))
+        index.forget({"b.md"})
+        index.update("c.md", "/c.html", self.entry("C", "cherry"))
+        index.write()
+        self.assertEqual(index.ids, {"b.md": 1, "c.md": 0})
+        self.assertEqual(self.shard("ba"), {"banana": [[1, 0]]})
+        with open(os.path.join(self.dst, "search", "index.json")) as f:
+            pages = json.load(f)["pages"]
+        self.assertEqual(pages, [["/c.html", "C", [""]], ["/b.html", "B", [""]]])
+
+    def test_freed_ids_survive_a_save(self):
+        index = SearchIndex.load(self.dst)
+        for name in "abc":
+            index.update(f"{name}.md", f"/{name}.html", self.entry(name, name * 2))
+        index.forget({"c.md"})
+        index.save()
+        index = SearchIndex.load(self.dst)
+        for name in "dxyz":
+            index.update(f"{name}.md", f"/{name}.html", self.entry(name, name * 2))
+        self.assertEqual([index.ids[f"{name}.md"] for name in "dxyz"], [0, 1, 3, 4])
+
+
+class TestSearchBuild(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.content, "blog"))
+        write(os.path.join(self.content, "index.md"), "# home\n\nwelcome")
+        write(os.path.join(self.content, "blog", "post.md"), "# post\n\n## intro\n\nwelcome aboard")
+        write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        genpage.enable_search()
+
+    def tearDown(self):
+        genpage.enable_search(False)
+        super().tearDown()
+
+    def build(self, sites=None):
+        with redirect_stdout(io.StringIO()) as out:
+            genpage.generate_sites_incremental(self.content, self.template, sites or [(self.public, "/ssg/")])
+        return out.getvalue()
+
+    def test_index_pages(self):
+        self.build()
+        index = SearchIndex.load(self.public)
+        post = index.pages[os.path.join(self.content, "blog", "post.md")]
+        self.assertEqual(post["url"], "/ssg/blog/post.html")
+        self.assertEqual(post["headings"], ["", "post", "intro"])
+        with gzip.open(os.path.join(self.public, "search", "we.json.gz")) as f:
+            self.assertEqual(len(json.load(f)["welcome"]), 2)
+
+    def test_incremental(self):
+        self.build()
+        out = self.build()
+        self.assertIn("0 generated", out)
+        self.assertIn("0 shards written", out)
+        write(os.path.join(self.content, "index.md"), "# home\n\nwelcome zebra")
+        out = self.build()
+        self.assertIn("1 generated", out)
+        self.assertIn("1 shards written", out)
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build()
+        self.assertEqual(list(SearchIndex.load(self.public).pages), [os.path.join(self.content, "index.md")])
+
+    def test_turned_on_later(self):
+        genpage.enable_search(False)
+        self.build()
+        genpage.enable_search()
+        self.assertIn("2 generated", self.build())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+
+from fixtures import SiteTestCase, read, write
+from serve import Watcher
+
+
+class TestWatcher(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.content, "blog"))
+        write(os.path.join(self.content, "index.md"), "# home")
+        write(os.path.join(self.content, "blog", "post.md"), "# post")
+        write(os.path.join(self.static, "index.css"), "body {}")
+        write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        self.watcher = Watcher(self.content, self.static, self.template, self.public)
+        with redirect_stdout(io.StringIO()):
+            self.watcher.build()
+
+    def poll(self):
+        with redirect_stdout(io.StringIO()) as out:
+            changed = self.watcher.poll()
+        return changed, out.getvalue()
+
+    def touch(self, path, text):
+        write(path, text)
+        # make sure the change is visible even on coarse mtime filesystems
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def test_page_turned_draft(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        self.touch(post, "---\ndraft: true\n---\n# post")
+        self.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "post.html")))
+        self.assertNotIn(post, self.watcher.manifest.pages)
+
+    def test_nothing_changed(self):
+        self.assertEqual(self.poll(), (False, ""))
+
+    def test_page_change_renders_only_that_page(self):
+        self.touch(os.path.join(self.content, "blog", "post.md"), "# post v2")
+        changed, out = self.poll()
+        self.assertTrue(changed)
+        self.assertEqual(out.count("generating from"), 1)
+        self.assertIn("post v2", read(os.path.join(self.public, "blog", "post.html")))
+
+    def test_new_and_deleted_pages(self):
+        self.touch(os.path.join(self.content, "blog", "new.md"), "# new")
+        self.poll()
+        self.assertTrue(os.path.exists(os.path.join(self.public, "blog", "new.html")))
+        os.remove(os.path.join(self.content, "blog", "new.md"))
+        self.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "new.html")))
+
+    def test_template_change_renders_all(self):
+        self.touch(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        _, out = self.poll()
+        self.assertEqual(out.count("generating from"), 2)
+        self.assertTrue(read(os.path.join(self.public, "index.html")).startswith("<h1>home"))
+
+    def test_section_template_renders_its_pages(self):
+        blog = os.path.join(os.path.dirname(self.template), "templates", "blog.html")
+        os.makedirs(os.path.dirname(blog))
+        self.touch(blog, "<article>{{ Content }}</article>")
+        _, out = self.poll()
+        self.assertEqual(out.count("generating from"), 2)
+        self.assertTrue(read(os.path.join(self.public, "blog", "post.html")).startswith("<article>"))
+        self.touch(blog, "<main>{{ Content }}</main>")
+        _, out = self.poll()
+        self.assertEqual(out.count("generating from"), 1)
+        self.assertTrue(read(os.path.join(self.public, "blog", "post.html")).startswith("<main>"))
+
+    def test_static_change(self):
+        self.touch(os.path.join(self.static, "index.css"), "body { color: red }")
+        self.poll()
+        self.assertEqual(read(os.path.join(self.public, "index.css")), "body { color: red }")
+        os.remove(os.path.join(self.static, "index.css"))
+        self.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css")))
+
+    def test_broken_page_keeps_serving(self):
+        self.touch(os.path.join(self.content, "index.md"), "# home\n\nan _unclosed italic")
+        _, out = self.poll()
+        self.assertIn("failed to generate", out)
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import io
+import json
+import os
+import unittest
+from contextlib import redirect_stdout
+from xml.etree import ElementTree
+
+from blocks import markdown_to_html_node
+from fixtures import SiteTestCase, read, write
+from genpage import generate_sites_incremental
+from sitemap import count_html_words, count_words, write_site_files
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+SITEMAP = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+class TestCountWords(unittest.TestCase):
+    def test_nodes_and_html(self):
+        node = markdown_to_html_node("# a title\n\nsome **bold** [link](/x.html) text")
+        self.assertEqual(count_words(node), 6)
+        self.assertEqual(count_html_words(node.to_html()), 6)
+
+
+class TestSiteFiles(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.content, "blog"))
+        write(os.path.join(self.content, "index.md"), "# My & Site\n\nhello there")
+        write(os.path.join(self.content, "blog", "index.md"), "# blog")
+        write(os.path.join(self.content, "blog", "old.md"), "# old post")
+        write(os.path.join(self.content, "blog", "new.md"), "# new post\n\nfresh words here")
+        os.makedirs(os.path.join(self.content, "blog", "dir"))
+        write(os.path.join(self.content, "blog", "dir", "index.md"), "# dir post")
+        os.utime(os.path.join(self.content, "blog", "dir", "index.md"), (2_000_000_000, 2_000_000_000))
+        os.utime(os.path.join(self.content, "blog", "old.md"), (1_000_000_000, 1_000_000_000))
+        write(self.template, "{{ Title }}{{ Content }}")
+
+    def build(self):
+        with redirect_stdout(io.StringIO()) as out:
+            generate_sites_incremental(self.content, self.template, [(self.public, "/ssg/")])
+            write_site_files(self.public, self.content, "https://example.com", "/ssg/")
+        return out.getvalue()
+
+    def read(self, name):
+        return read(os.path.join(self.public, name))
+
+    def test_files(self):
+        self.build()
+        urls = [
+            loc.text for loc in ElementTree.fromstring(self.read("sitemap.xml")).iter(f"{SITEMAP}loc")
+        ]
+        self.assertEqual(
+            urls,
+            [
+                "https://example.com/ssg/blog/dir/",
+                "https://example.com/ssg/blog/",
+                "https://example.com/ssg/blog/new.html",
+                "https://example.com/ssg/blog/old.html",
+                "https://example.com/ssg/",
+            ],
+        )
+
+        feed = ElementTree.fromstring(self.read("feed.xml"))
+        self.assertEqual(feed.find(f"{ATOM}title").text, "My & Site")
+        titles = [e.find(f"{ATOM}title").text for e in feed.iter(f"{ATOM}entry")]
+        self.assertEqual(titles, ["dir post", "new post", "old post"])
+
+        pages = {p["source"]: p for p in json.loads(self.read("pages.json"))}
+        self.assertEqual(pages["blog/new.md"]["words"], 5)
+        self.assertEqual(pages["blog/new.md"]["url"], "/ssg/blog/new.html")
+        self.assertEqual(pages["blog/old.md"]["updated"], "2001-09-09T01:46:40+00:00")
+
+    def test_front_matter(self):
+        write(os.path.join(self.content, "blog", "old.md"), "---\ndate: 2040-01-02\nweight: -1\n---\n# old post")
+        self.build()
+        feed = ElementTree.fromstring(self.read("feed.xml"))
+        first = next(feed.iter(f"{ATOM}entry"))
+        self.assertEqual(first.find(f"{ATOM}title").text, "old post")
+        self.assertEqual(first.find(f"{ATOM}updated").text, "2040-01-02T00:00:00+00:00")
+        pages = json.loads(self.read("pages.json"))
+        self.assertEqual(pages[0]["source"], "blog/old.md")
+        self.assertEqual(pages[0]["date"], "2040-01-02")
+
+    def test_incremental(self):
+        self.build()
+        out = self.build()
+        self.assertIn("0 generated", out)
+        self.assertIn("0 files written", out)
+        write(os.path.join(self.content, "blog", "new.md"), "# newer post")
+        out = self.build()
+        self.assertIn("1 generated", out)
+        self.assertNotIn("0 files written", out)
+        self.assertIn("newer post", self.read("feed.xml"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import io
+import os
+import unittest
+from contextlib import redirect_stdout
+
+from fixtures import SiteTestCase, read, write
+from manifest import load_asset_manifest
+import static
+from static import fingerprint_name, sync_static
+
+
+class TestSyncStatic(SiteTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.static, "images"))
+        write(os.path.join(self.static, "index.css"), "body {}")
+        write(os.path.join(self.static, "images", "a.png"), "png")
+
+    def sync(self, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            return sync_static(self.static, self.public, **kwargs)
+
+    def test_first_sync(self):
+        counts = self.sync()
+        self.assertEqual(counts["copied"] + counts["linked"] + counts["cloned"], 2)
+        self.assertEqual(read(os.path.join(self.public, "images", "a.png")), "png")
+
+    def test_second_sync_skips(self):
+        self.sync()
+        counts = self.sync()
+        self.assertEqual(counts["unchanged"], 2)
+        self.assertEqual(counts["copied"] + counts["linked"] + counts["cloned"], 0)
+
+    def test_no_link_copies(self):
+        self.sync(link=False)
+        a = os.stat(os.path.join(self.static, "index.css"))
+        b = os.stat(os.path.join(self.public, "index.css"))
+        self.assertNotEqual(a.st_ino, b.st_ino)
+        self.assertEqual(a.st_mtime_ns, b.st_mtime_ns)
+        self.assertEqual(self.sync(link=False)["unchanged"], 2)
+
+    def test_changed_file_resynced(self):
+        self.sync(link=False)
+        write(os.path.join(self.static, "index.css"), "body { color: red }")
+        counts = self.sync(link=False)
+        self.assertEqual(counts["copied"], 1)
+        self.assertEqual(read(os.path.join(self.public, "index.css")), "body { color: red }")
+
+    def test_checksum_catches_same_size_and_mtime(self):
+        self.sync(link=False)
+        path = os.path.join(self.public, "index.css")
+        st = os.stat(path)
+        write(path, "body {!")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertEqual(self.sync(link=False)["unchanged"], 2)
+        self.assertEqual(self.sync(link=False, checksum=True)["copied"], 1)
+        self.assertEqual(read(path), "body {}")
+
+    def test_prunes_only_synced_files(self):
+        self.sync()
+        write(os.path.join(self.public, "index.html"), "rendered page")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        counts = self.sync()
+        self.assertEqual(counts["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_clean(self):
+        os.makedirs(self.public)
+        write(os.path.join(self.public, "stray.html"), "")
+        self.sync(clean=True)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "stray.html")))
+
+    def fingerprinted(self, rel):
+        return load_asset_manifest(self.public)["/" + rel][1:]
+
+    def test_fingerprint(self):
+        write(os.path.join(self.static, "CNAME"), "example.com")
+        self.sync(fingerprint=True)
+        css = self.fingerprinted("index.css")
+        self.assertRegex(css, r"^index\.[0-9a-f]{10}\.css$")
+        self.assertEqual(read(os.path.join(self.public, css)), "body {}")
+        # kept for the urls in css and js, which are not rewritten
+        self.assertEqual(read(os.path.join(self.public, "index.css")), "body {}")
+        self.assertTrue(os.path.exists(os.path.join(self.public, "CNAME")))
+        self.assertNotIn("/CNAME", load_asset_manifest(self.public))
+        self.assertEqual(self.sync(fingerprint=True)["unchanged"], 3)
+
+    def test_fingerprint_does_not_reread_copies(self):
+        self.sync(link=False, fingerprint=True)
+        hashed = []
+        hash_file = static.hash_file
+        static.hash_file = lambda path: hashed.append(path) or hash_file(path)
+        try:
+            self.assertEqual(self.sync(link=False, fingerprint=True)["unchanged"], 2)
+        finally:
+            static.hash_file = hash_file
+        self.assertEqual(hashed, [])
+
+    def test_asset_manifest_kept_when_unchanged(self):
+        self.sync(fingerprint=True)
+        path = os.path.join(self.public, "asset-manifest.json")
+        os.utime(path, ns=(0, 0))
+        self.sync(fingerprint=True)
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+
+    def test_fingerprint_changes_with_content(self):
+        self.sync(fingerprint=True)
+        old = self.fingerprinted("index.css")
+        write(os.path.join(self.static, "index.css"), "body { color: red }")
+        self.sync(fingerprint=True)
+        new = self.fingerprinted("index.css")
+        self.assertNotEqual(old, new)
+        self.assertFalse(os.path.exists(os.path.join(self.public, old)))
+        self.assertEqual(read(os.path.join(self.public, new)), "body { color: red }")
+
+    def test_fingerprint_prunes_both_names(self):
+        self.sync(fingerprint=True)
+        png = self.fingerprinted("images/a.png")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        self.assertEqual(self.sync(fingerprint=True)["removed"], 1)
+        self.assertFalse(os.path.exists(os.path.join(self.public, png)))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+
+    def test_fingerprint_off_restores_names(self):
+        self.sync(fingerprint=True)
+        css = self.fingerprinted("index.css")
+        self.sync()
+        self.assertFalse(os.path.exists(os.path.join(self.public, css)))
+        self.assertEqual(read(os.path.join(self.public, "index.css")), "body {}")
+        self.assertEqual(load_asset_manifest(self.public), {})
+
+    def test_fingerprint_name(self):
+        self.assertEqual(fingerprint_name(os.path.join("a", "b.png"), "12"), os.path.join("a", "b.12.png"))
+        self.assertEqual(fingerprint_name("LICENSE", "12"), "LICENSE.12")
+        self.assertEqual(fingerprint_name("b.png", None), "b.png")
+
+
+if __name__ == "__main__":
+    unittest.main()
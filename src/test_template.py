@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+from fixtures import write
+from template import Layouts, Template, basepath_rewriter, load_template, new_build
+
+
+class TestTemplate(unittest.TestCase):
+    def render(self, template, slots, rewrite_url=None):
+        parts = []
+        template.render(parts.append, slots, rewrite_url)
+        return "".join(parts)
+
+    def test_segments(self):
+        t = Template("<title>{{ Title }}</title>{{ Content }}!")
+        self.assertEqual(t.segments, ["<title>", "Title", "</title>", "Content", "!"])
+
+    def test_render(self):
+        t = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        html = self.render(t, {"Title": "hi", "Content": lambda write: write("<p>x</p>")})
+        self.assertEqual(html, "<title>hi</title><main><p>x</p></main>")
+
+    def test_unknown_slot_kept(self):
+        t = Template("{{ Title }} {{ Nope }}")
+        self.assertEqual(self.render(t, {"Title": "hi"}), "hi {{ Nope }}")
+
+    def test_rewrites_static_urls(self):
+        t = Template('<link href="/index.css"><img src="/a.png"><a href="https://x.com/">{{ Content }}')
+        html = self.render(t, {"Content": ""}, basepath_rewriter("/ssg/"))
+        self.assertEqual(html, '<link href="/ssg/index.css"><img src="/ssg/a.png"><a href="https://x.com/">')
+
+    def test_basepath_rewriter(self):
+        self.assertIsNone(basepath_rewriter("/"))
+        rewrite = basepath_rewriter("/ssg/")
+        self.assertIs(rewrite, basepath_rewriter("/ssg/"))
+        self.assertEqual(rewrite("/blog/tom"), "/ssg/blog/tom")
+        self.assertEqual(rewrite("https://boot.dev"), "https://boot.dev")
+        self.assertEqual(rewrite("//cdn.example.com/x.js"), "//cdn.example.com/x.js")
+
+    def test_rewriter_swaps_fingerprinted_assets(self):
+        assets = (("/a.png", "/a.1234.png"),)
+        rewrite = basepath_rewriter("/", assets)
+        self.assertEqual(rewrite("/a.png"), "/a.1234.png")
+        self.assertEqual(rewrite("/a.png?v=1"), "/a.1234.png?v=1")
+        self.assertEqual(rewrite("/b.png"), "/b.png")
+        self.assertEqual(basepath_rewriter("/ssg/", assets)("/a.png"), "/ssg/a.1234.png")
+        self.assertNotEqual(rewrite.cache_key, "/")
+
+    def test_load_template_cached(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Title }}")
+            self.assertIs(load_template(path), load_template(path))
+            with open(path, "w") as f:
+                f.write("<b>{{ Title }}</b>")
+            os.utime(path, ns=(1, 1))
+            # checked for edits once per build
+            self.assertEqual(load_template(path).segments, ["", "Title", ""])
+            new_build()
+            self.assertEqual(load_template(path).segments, ["<b>", "Title", "</b>"])
+
+    def test_includes(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "template.html")
+            header = os.path.join(d, "partials", "header.html")
+            nav = os.path.join(d, "partials", "nav.html")
+            os.makedirs(os.path.dirname(header))
+            write(path, "{{ include partials/header.html }}{{ Content }}")
+            write(header, "<h1>{{ Title }}</h1>{{ include nav.html }}")
+            write(nav, "<nav></nav>")
+            new_build()
+            template = load_template(path)
+            self.assertEqual(template.segments, ["<h1>", "Title", "</h1><nav></nav>", "Content", ""])
+            self.assertEqual(template.files, [path, header, nav])
+            write(nav, "<nav>{{ include ../template.html }}</nav>")
+            os.utime(nav, ns=(1, 1))
+            new_build()
+            with self.assertRaisesRegex(ValueError, "includes itself"):
+                load_template(path)
+
+    def test_layouts(self):
+        with tempfile.TemporaryDirectory() as d:
+            default = os.path.join(d, "template.html")
+            content = os.path.join(d, "content")
+            blog = os.path.join(d, "templates", "blog.html")
+            landing = os.path.join(d, "templates", "landing.html")
+            os.makedirs(os.path.dirname(blog))
+            write(blog, "")
+            write(landing, "")
+            layouts = Layouts(default, content)
+            self.assertEqual(layouts.select(os.path.join(content, "index.md")), default)
+            self.assertEqual(layouts.select(os.path.join(content, "blog", "tom", "index.md")), blog)
+            self.assertEqual(layouts.select(os.path.join(content, "contact", "index.md")), default)
+            self.assertEqual(layouts.select(os.path.join(content, "blog", "a.md"), {"template": "landing.html"}), landing)
+            with self.assertRaises(ValueError):
+                layouts.select(os.path.join(content, "a.md"), {"template": "missing.html"})
+
+
+if __name__ == "__main__":
+    unittest.main()
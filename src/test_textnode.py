@@ -1,3 +1,4 @@
+import random
 import unittest
 
 from textnode import (
@@ -35,6 +36,9 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This", TextType.TEXT)
         self.assertEqual(node, node2)
 
+    def test_no_dict(self):
+        self.assertFalse(hasattr(TextNode("x", TextType.TEXT), "__dict__"))
+
     def test_no_url_not_eq(self):
         node = TextNode("T", TextType.LINK, "")
         node = TextNode("T", TextType.LINK)
@@ -457,6 +461,61 @@ class TestTextToTextNodes(unittest.TestCase):
         with self.assertRaises(Exception):
             text_to_textnodes("this has an '_' that somehow makes it bad")
 
+    def test_text_to_textnodes_no_link_across_delimiter(self):
+        tn = text_to_textnodes("[x](y_z_) and `[a](b)`")
+        self.assertEqual(
+            tn,
+            [
+                TextNode("[x](y", TextType.TEXT),
+                TextNode("z", TextType.ITALIC),
+                TextNode(") and ", TextType.TEXT),
+                TextNode("[a](b)", TextType.CODE),
+            ],
+        )
+
+    def test_text_to_textnodes_empty_spans(self):
+        tn = text_to_textnodes("a````b****c")
+        self.assertEqual(
+            tn,
+            [
+                TextNode("a", TextType.TEXT),
+                TextNode("b", TextType.TEXT),
+                TextNode("c", TextType.TEXT),
+            ],
+        )
+
+    def test_text_to_textnodes_unclosed_across_code(self):
+        with self.assertRaises(Exception):
+            text_to_textnodes("**bold `code` still bold**")
+
+    def test_text_to_textnodes_matches_split_chain(self):
+        pieces = ["a", " ", "`", "*", "**", "_", "!", "[", "]", "(", ")", "[x](y)", "![x](y)", "]("]
+        rng = random.Random(7)
+        for _ in range(3000):
+            text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+            self.assertEqual(
+                run_or_error(text_to_textnodes, text),
+                run_or_error(split_chain, text),
+                text,
+            )
+
+
+def split_chain(text):
+    tn = TextNode(text, TextType.TEXT)
+    tn = split_nodes_delimiter([tn], "`", TextType.CODE)
+    tn = split_nodes_delimiter(tn, "**", TextType.BOLD)
+    tn = split_nodes_delimiter(tn, "_", TextType.ITALIC)
+    tn = split_nodes_image(tn)
+    tn = split_nodes_link(tn)
+    return tn
+
+
+def run_or_error(fn, text):
+    try:
+        return fn(text)
+    except Exception:
+        return "error"
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+import blocks
+import timing
+
+
+class TestProfiler(unittest.TestCase):
+    def test_nested_stages_are_self_time(self):
+        p = timing.Profiler()
+        with p.page("a.md"):
+            with p.stage("outer"):
+                time.sleep(0.002)
+                with p.stage("inner"):
+                    time.sleep(0.01)
+        stages = p.pages[0]["stages"]
+        self.assertLess(stages["outer"][0], 0.01)
+        self.assertGreaterEqual(stages["inner"][0], 0.01)
+        self.assertLessEqual(stages["outer"][0] + stages["inner"][0], p.pages[0]["time"])
+
+    def test_stage_outside_page(self):
+        p = timing.Profiler()
+        with p.stage("static"):
+            pass
+        self.assertEqual(p.stages["static"][1], 1)
+        self.assertEqual(p.totals()["static"][1], 1)
+
+    def test_percentile(self):
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(timing.percentile(values, 50), 50.0)
+        self.assertEqual(timing.percentile(values, 99), 99.0)
+        self.assertEqual(timing.percentile([3.0], 90), 3.0)
+        self.assertEqual(timing.percentile([], 90), 0.0)
+
+    def test_summary_slowest(self):
+        p = timing.Profiler()
+        p.merge([
+            {"path": "fast.md", "time": 0.001, "stages": {"read": [0.001, 1]}},
+            {"path": "slow.md", "time": 0.5, "stages": {"read": [0.5, 1]}},
+        ])
+        summary = p.summary(top=1)
+        self.assertEqual([page["path"] for page in summary["slowest"]], ["slow.md"])
+        self.assertEqual(summary["stages"]["read"]["calls"], 2)
+        self.assertIn("slow.md", p.report(top=1))
+
+    def test_write_json(self):
+        p = timing.Profiler()
+        with p.page("a.md"):
+            pass
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "profile.json")
+            p.write_json(path, wall=1.0)
+            with open(path) as f:
+                data = json.load(f)
+        self.assertEqual(data["pages"]["count"], 1)
+        self.assertEqual(data["wall"], 1.0)
+
+
+class TestEnable(unittest.TestCase):
+    def tearDown(self):
+        timing.disable()
+
+    def test_disabled_is_noop(self):
+        self.assertIsNone(timing.PROFILER)
+        with timing.stage("x"), timing.page("y"):
+            pass
+
+    def test_enable_instruments_parser(self):
+        original = blocks.classify_block
+        profiler = timing.enable()
+        self.assertIsNot(blocks.classify_block, original)
+        with timing.page("a.md"):
+            blocks.markdown_to_html_node("# hi\n\nsome **text**")
+        stages = profiler.pages[0]["stages"]
+        self.assertEqual(stages["classify"][1], 2)
+        self.assertEqual(stages["inline"][1], 2)
+        timing.disable()
+        self.assertIs(blocks.classify_block, original)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from writer import TMP_SUFFIX, OutputWriter
+
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_queued_pages(self):
+        paths = [os.path.join(self.root, "a", f"{i}.html") for i in range(20)]
+        with OutputWriter(threads=3, maxsize=2) as writer:
+            for i, path in enumerate(paths):
+                writer.submit(path, f"page {i}".encode())
+        for i, path in enumerate(paths):
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), f"page {i}".encode())
+        self.assertEqual(writer.written, 20)
+        self.assertEqual(len(os.listdir(os.path.join(self.root, "a"))), 20)
+
+    def test_same_bytes_keep_mtime(self):
+        path = os.path.join(self.root, "index.html")
+        with OutputWriter(threads=0) as writer:
+            writer.submit(path, b"hello")
+            os.utime(path, ns=(0, 0))
+            writer.submit(path, b"hello")
+            self.assertEqual(os.stat(path).st_mtime_ns, 0)
+            writer.submit(path, b"hello!")
+        self.assertNotEqual(os.stat(path).st_mtime_ns, 0)
+        self.assertEqual((writer.written, writer.unchanged), (2, 1))
+
+    def test_recreates_removed_directory(self):
+        path = os.path.join(self.root, "blog", "post.html")
+        writer = OutputWriter(threads=0)
+        writer.write(path, b"one")
+        shutil.rmtree(os.path.join(self.root, "blog"))
+        writer.write(path, b"two")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"two")
+
+    def test_failed_write_raises_on_close(self):
+        blocker = os.path.join(self.root, "file")
+        with open(blocker, "w") as f:
+            f.write("not a directory")
+        writer = OutputWriter(threads=1)
+        writer.submit(os.path.join(blocker, "page.html"), b"x")
+        with self.assertRaises(OSError):
+            writer.close()
+
+    def test_failed_replace_leaves_old_page(self):
+        path = os.path.join(self.root, "index.html")
+        writer = OutputWriter(threads=0)
+        writer.write(path, b"old")
+        with self.assertRaises(RuntimeError):
+            with writer.replace(path) as f:
+                f.write("half")
+                raise RuntimeError
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"old")
+        self.assertFalse(os.path.exists(path + TMP_SUFFIX))
+
+
+if __name__ == "__main__":
+    unittest.main()
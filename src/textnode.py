@@ -13,6 +13,8 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -118,11 +120,51 @@ def split_nodes_link(old_nodes):
     return new_nodes
 
 
+# one token pattern per inline context: inside code only a closing backtick
+# matters, inside bold only backticks and **, inside italic any delimiter
+_INLINE_TOKENS = {
+    TextType.TEXT: re.compile(r"`|\*\*|_|!?\[([^\[\]]*)\]\(([^\(\)]*)\)"),
+    TextType.CODE: re.compile(r"`"),
+    TextType.BOLD: re.compile(r"`|\*\*"),
+    TextType.ITALIC: re.compile(r"`|\*\*|_"),
+}
+_DELIMITERS = {"`": TextType.CODE, "**": TextType.BOLD, "_": TextType.ITALIC}
+
+
 def text_to_textnodes(text):
-    tn = TextNode(text, TextType.TEXT)
-    tn = split_nodes_delimiter([tn], "`", TextType.CODE)
-    tn = split_nodes_delimiter(tn, "**", TextType.BOLD)
-    tn = split_nodes_delimiter(tn, "_", TextType.ITALIC)
-    tn = split_nodes_image(tn)
-    tn = split_nodes_link(tn)
-    return tn
+    # Single left-to-right scan. Produces exactly what the old chain of
+    # split_nodes_delimiter (`, **, _) -> split_nodes_image -> split_nodes_link
+    # produced: code beats bold beats italic, spans never nest, images and
+    # links are only recognised in plain text and never across a delimiter.
+    nodes = []
+    state = TextType.TEXT
+    start = pos = 0
+    while m := _INLINE_TOKENS[state].search(text, pos):
+        token = m.group(0)
+        if state != TextType.TEXT:
+            if _DELIMITERS[token] != state:
+                raise Exception("invalid markdown, not closed")
+            if m.start() > start:
+                nodes.append(TextNode(text[start : m.start()], state))
+            state = TextType.TEXT
+        elif token in _DELIMITERS:
+            if m.start() > start:
+                nodes.append(TextNode(text[start : m.start()], TextType.TEXT))
+            state = _DELIMITERS[token]
+        elif "`" in token or "**" in token or "_" in token:
+            # the delimiter splits this [..](..) apart, so it isn't a link
+            pos = m.start() + 1
+            continue
+        else:
+            if m.start() > start:
+                nodes.append(TextNode(text[start : m.start()], TextType.TEXT))
+            if token[0] == "!":
+                nodes.append(TextNode(m.group(1), TextType.IMAGE, m.group(2)))
+            else:
+                nodes.append(TextNode(m.group(1), TextType.LINK, m.group(2)))
+        start = pos = m.end()
+    if state != TextType.TEXT:
+        raise Exception("invalid markdown, not closed")
+    if start < len(text):
+        nodes.append(TextNode(text[start:], TextType.TEXT))
+    return nodes
@@ -0,0 +1,188 @@
+# build profiling behind --profile. disabled, stage() is a shared no-op and the
+# parser's hot functions are untouched; enable() swaps in timed wrappers
+import functools
+import json
+import math
+import time
+from contextlib import contextmanager, nullcontext
+
+PROFILER = None
+_NOOP = nullcontext()
+
+# (module, function) pairs timed as a stage wherever that module calls them
+INSTRUMENTED = [
+    ("blocks", "markdown_to_blocks", "blocks"),
+    ("blocks", "classify_block", "classify"),
+    ("blocks", "text_to_textnodes", "inline"),
+]
+_originals = {}
+
+
+class Profiler:
+    def __init__(self):
+        self.stages = {}  # name -> [self seconds, calls] outside any page
+        self.pages = []  # {"path", "time", "stages": {name: self seconds}}
+        self._stack = []  # [name, child seconds] of the stages currently open
+        self._page = None
+
+    @contextmanager
+    def stage(self, name):
+        # self time only: a nested stage's time is taken out of its parent's,
+        # so the stages of a page add up to the page total
+        frame = [name, 0.0]
+        self._stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1][1] += elapsed
+            self._add(name, elapsed - frame[1])
+
+    def _add(self, name, seconds):
+        stages = self._page["stages"] if self._page is not None else self.stages
+        total = stages.setdefault(name, [0.0, 0])
+        total[0] += seconds
+        total[1] += 1
+
+    @contextmanager
+    def page(self, path):
+        self._page = {"path": path, "time": 0.0, "stages": {}}
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._page["time"] = time.perf_counter() - start
+            self.pages.append(self._page)
+            self._page = None
+
+    def drain(self):
+        pages, self.pages = self.pages, []
+        return pages
+
+    def merge(self, pages):
+        self.pages.extend(pages)
+
+    def totals(self):
+        totals = {name: list(v) for name, v in self.stages.items()}
+        for page in self.pages:
+            for name, (seconds, calls) in page["stages"].items():
+                total = totals.setdefault(name, [0.0, 0])
+                total[0] += seconds
+                total[1] += calls
+        return totals
+
+    def summary(self, top=10, wall=None):
+        times = sorted(page["time"] for page in self.pages)
+        slowest = sorted(self.pages, key=lambda page: page["time"], reverse=True)[:top]
+        return {
+            "wall": wall,
+            "stages": {
+                name: {"total": seconds, "calls": calls}
+                for name, (seconds, calls) in sorted(self.totals().items(), key=lambda kv: -kv[1][0])
+            },
+            "pages": {
+                "count": len(times),
+                "total": sum(times),
+                "p50": percentile(times, 50),
+                "p90": percentile(times, 90),
+                "p99": percentile(times, 99),
+                "max": times[-1] if times else 0.0,
+            },
+            "slowest": [
+                {
+                    "path": page["path"],
+                    "time": page["time"],
+                    "stages": {name: seconds for name, (seconds, _) in page["stages"].items()},
+                }
+                for page in slowest
+            ],
+        }
+
+    def report(self, top=10, wall=None):
+        summary = self.summary(top, wall)
+        accounted = sum(stage["total"] for stage in summary["stages"].values()) or 1.0
+        lines = [f"{'stage':<10} {'total':>10} {'calls':>8} {'share':>7}"]
+        for name, stage in summary["stages"].items():
+            lines.append(
+                f"{name:<10} {stage['total'] * 1000:>8.1f}ms {stage['calls']:>8} "
+                f"{stage['total'] / accounted * 100:>6.1f}%"
+            )
+        pages = summary["pages"]
+        lines.append(
+            f"{pages['count']} pages: p50 {pages['p50'] * 1000:.2f}ms, p90 {pages['p90'] * 1000:.2f}ms, "
+            f"p99 {pages['p99'] * 1000:.2f}ms, max {pages['max'] * 1000:.2f}ms"
+        )
+        if summary["slowest"]:
+            lines.append(f"slowest {len(summary['slowest'])}:")
+            for page in summary["slowest"]:
+                lines.append(f"  {page['time'] * 1000:>8.2f}ms  {page['path']}")
+        if wall is not None:
+            lines.append(f"wall {wall * 1000:.1f}ms")
+        return "\n".join(lines)
+
+    def write_json(self, path, top=10, wall=None):
+        with open(path, "w") as f:
+            json.dump(self.summary(top, wall), f, indent=1)
+
+
+def percentile(sorted_values, p):
+    # nearest rank
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(p / 100 * len(sorted_values)) - 1
+    return sorted_values[max(0, min(len(sorted_values) - 1, rank))]
+
+
+def stage(name):
+    if PROFILER is None:
+        return _NOOP
+    return PROFILER.stage(name)
+
+
+def page(path):
+    if PROFILER is None:
+        return _NOOP
+    return PROFILER.page(path)
+
+
+def enable():
+    global PROFILER
+    PROFILER = Profiler()
+    for module_name, fn_name, stage_name in INSTRUMENTED:
+        module = __import__(module_name)
+        if (module_name, fn_name) in _originals:
+            continue
+        fn = getattr(module, fn_name)
+        _originals[(module_name, fn_name)] = fn
+        setattr(module, fn_name, _timed(fn, stage_name))
+    return PROFILER
+
+
+def disable():
+    global PROFILER
+    PROFILER = None
+    for (module_name, fn_name), fn in _originals.items():
+        setattr(__import__(module_name), fn_name, fn)
+    _originals.clear()
+
+
+def init_worker(enabled):
+    # pool workers start their own profiler and hand page records back with drain()
+    if enabled:
+        enable()
+
+
+def drain():
+    return PROFILER.drain() if PROFILER is not None else []
+
+
+def _timed(fn, stage_name):
+    @functools.wraps(fn)
+    def timed(*args, **kwargs):
+        with PROFILER.stage(stage_name):
+            return fn(*args, **kwargs)
+
+    return timed
@@ -0,0 +1,135 @@
+# write-behind output stage: rendered pages are queued and written by a few
+# threads while the next page renders. every write goes to a temp file that is
+# renamed over the destination, and a page whose bytes are already on disk is
+# left alone so its mtime only moves when its content does
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+TMP_SUFFIX = ".write-tmp"
+
+
+class OutputWriter:
+    def __init__(self, threads=2, maxsize=64):
+        # threads=0 writes inline on submit, for callers that render one page
+        self.made_dirs = set()
+        self.written = 0
+        self.unchanged = 0
+        self._error = None
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize)
+        self._threads = [threading.Thread(target=self._drain, daemon=True) for _ in range(threads)]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # an error already on its way out wins over a failed write
+        try:
+            self.close()
+        except Exception:
+            if exc_type is None:
+                raise
+
+    def submit(self, dest_path, data):
+        # blocks once maxsize pages are waiting, so rendering can't outrun the disk unbounded
+        self._raise_error()
+        if not self._threads:
+            self.write(dest_path, data)
+        else:
+            self._queue.put((dest_path, data))
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self._raise_error()
+
+    def _drain(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue
+            try:
+                self.write(*item)
+            except BaseException as e:
+                with self._lock:
+                    if self._error is None:
+                        self._error = e
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def write(self, dest_path, data):
+        if same_bytes(dest_path, data):
+            with self._lock:
+                self.unchanged += 1
+            return False
+        with self.replace(dest_path, "wb") as f:
+            f.write(data)
+        with self._lock:
+            self.written += 1
+        return True
+
+    @contextmanager
+    def replace(self, dest_path, mode="w"):
+        # yields a file that becomes dest_path only once it is closed without error
+        tmp = dest_path + TMP_SUFFIX
+        parent = os.path.dirname(dest_path)
+        if parent not in self.made_dirs:
+            self.makedirs(parent)
+        try:
+            f = open_tmp(tmp, mode)
+        except FileNotFoundError:
+            # removed since we made it, e.g. by remove_output
+            self.makedirs(parent)
+            f = open_tmp(tmp, mode)
+        try:
+            with f:
+                yield f
+            os.replace(tmp, dest_path)
+        except BaseException:
+            if os.path.lexists(tmp):
+                os.remove(tmp)
+            raise
+
+    def makedirs(self, path):
+        if path:
+            os.makedirs(path, exist_ok=True)
+        self.made_dirs.add(path)
+
+
+def same_bytes(path, data):
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == data
+    except FileNotFoundError:
+        return False
+
+
+def open_tmp(path, mode):
+    return open(path, mode) if "b" in mode else open(path, mode, encoding="utf-8")
+
+
+def remove_output(dest_path, dest_dir_path):
+    if not os.path.exists(dest_path):
+        return False
+    os.remove(dest_path)
+    # clean up directories the file left empty, but never the output root
+    root = os.path.abspath(dest_dir_path)
+    d = os.path.dirname(os.path.abspath(dest_path))
+    while d != root and d.startswith(root) and not os.listdir(d):
+        os.rmdir(d)
+        d = os.path.dirname(d)
+    return True